@@ -0,0 +1,178 @@
+"""
+Self-play arena: full games between two engine configurations.
+
+Every opening, a distinct position (up to symmetry) a number of plies from
+the start, is played twice with colors swapped. Games are spread over a
+process pool. The report gives, for each configuration, wins, draws, losses,
+win rate (draws count half), average time per move and nodes per move.
+
+A configuration is mode:depth, optionally followed by the weights of a
+vector_eval.BatchEvaluator as positional,mobility,frontier:
+    python arena.py tt:4 pvs:3:1,5,-2 --plies 4
+"""
+import argparse
+import json
+import multiprocessing
+import time
+
+from hw1cs561s2017 import TRACE_MODE, TT_MODE, PVS_MODE, TRACE_OFF, SearchContext, TraceSink, actions, \
+    alpha_beta_search, best_action, board_config, popcount, take_action
+from opening_book import canonical_position, start_state, state_of
+
+
+def parse_config(text):
+    """
+    :param text: mode:depth or mode:depth:positional,mobility,frontier
+    :return: configuration {'name', 'mode', 'depth', 'weights'}, weights None for utility
+    :rtype: dict
+    """
+    parts = text.split(':')
+    if len(parts) not in (2, 3) or parts[0] not in (TRACE_MODE, TT_MODE, PVS_MODE):
+        raise ValueError('configuration is mode:depth[:positional,mobility,frontier]: {0}'.format(text))
+    weights = None
+    if len(parts) == 3:
+        weights = tuple(float(w) for w in parts[2].split(','))
+        if len(weights) != 3:
+            raise ValueError('evaluation weights are positional,mobility,frontier: {0}'.format(text))
+    return {'name': text, 'mode': parts[0], 'depth': int(parts[1]), 'weights': weights}
+
+
+def opening_positions(plies, board):
+    """
+    :type board: hw1cs561s2017.BoardConfig
+    :return: canonical positions exactly 'plies' moves from the start, in
+    sorted order, that the player to move can play from
+    :rtype: List[(int, int, int)]
+    """
+    frontier = set([canonical_position(start_state(board))])
+    for ply in range(plies):
+        next_frontier = set()
+        for position in frontier:
+            state = state_of(position, board)
+            for a in actions(state):
+                state.make_move(a)
+                next_frontier.add(canonical_position(state))
+                state.unmake_move()
+        frontier = next_frontier
+    return sorted(p for p in frontier if len(actions(state_of(p, board))) > 0)
+
+
+def choose_move(config, state):
+    """
+    :return: (best action or None to pass, nodes visited)
+    """
+    leaf_evaluator = None
+    if config['weights'] is not None:
+        from vector_eval import BatchEvaluator
+        leaf_evaluator = BatchEvaluator(*config['weights'])
+    ctx = SearchContext(config['depth'], state.player, config['mode'], trace=TraceSink(level=TRACE_OFF),
+                        leaf_evaluator=leaf_evaluator)
+    alpha_beta_search(ctx, state)
+    return best_action(ctx), ctx.nodes
+
+
+def play_game(job):
+    """
+    :param job: (opening position, configuration of X, configuration of O, board configuration)
+    :return: (job, final disc differential for X, per color [moves, seconds, nodes])
+    """
+    position, x_config, o_config, board = job
+    state = state_of(position, board)
+    configs = {1: x_config, -1: o_config}
+    stats = {1: [0, 0.0, 0], -1: [0, 0.0, 0]}
+    passes = 0
+    while passes < 2:
+        if len(actions(state)) == 0:
+            passes += 1
+            take_action(state, 'pass')
+            continue
+        passes = 0
+        start = time.time()
+        a, nodes = choose_move(configs[state.player], state)
+        elapsed = time.time() - start
+        s = stats[state.player]
+        s[0], s[1], s[2] = s[0] + 1, s[1] + elapsed, s[2] + nodes
+        take_action(state, a)
+    return job, popcount(state.x_bits) - popcount(state.o_bits), stats
+
+
+def run_arena(config_a, config_b, plies=4, games=None, processes=None, board=None):
+    """
+    :param config_a: configuration, see parse_config
+    :param config_b: configuration, see parse_config
+    :param plies: distance of the openings from the start
+    :param games: play only the first games // 2 openings, all if None
+    :param processes: pool size, number of CPUs if None
+    :param board: board configuration, board_config() if None
+    :type board: hw1cs561s2017.BoardConfig
+    :return: report with one entry per configuration
+    :rtype: dict
+    """
+    if board is None:
+        board = board_config()
+    openings = opening_positions(plies, board)
+    if games is not None:
+        openings = openings[:max(1, games // 2)]
+    jobs = []
+    for position in openings:
+        jobs.append((position, config_a, config_b, board))
+        jobs.append((position, config_b, config_a, board))
+    totals = dict((c['name'], {'wins': 0, 'draws': 0, 'losses': 0, 'moves': 0, 'seconds': 0.0, 'nodes': 0})
+                  for c in (config_a, config_b))
+    pool = multiprocessing.Pool(processes)
+    try:
+        for (position, x_config, o_config, _), diff, stats in pool.imap_unordered(play_game, jobs):
+            for color, config in ((1, x_config), (-1, o_config)):
+                t = totals[config['name']]
+                result = diff * color
+                t['wins' if result > 0 else 'losses' if result < 0 else 'draws'] += 1
+                moves, seconds, nodes = stats[color]
+                t['moves'] += moves
+                t['seconds'] += seconds
+                t['nodes'] += nodes
+    finally:
+        pool.terminate()
+    report = {'board_size': board.size, 'plies': plies, 'games': len(jobs), 'configs': []}
+    for config in (config_a, config_b):
+        t = totals[config['name']]
+        report['configs'].append({
+            'name': config['name'],
+            'wins': t['wins'],
+            'draws': t['draws'],
+            'losses': t['losses'],
+            'win_rate': (t['wins'] + 0.5 * t['draws']) / len(jobs) if jobs else None,
+            'ms_per_move': 1000.0 * t['seconds'] / t['moves'] if t['moves'] else None,
+            'nodes_per_move': float(t['nodes']) / t['moves'] if t['moves'] else None})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play two engine configurations against each other.')
+    parser.add_argument('a', help='first configuration, mode:depth[:positional,mobility,frontier]')
+    parser.add_argument('b', help='second configuration')
+    parser.add_argument('--plies', type=int, default=4, help='moves from the start of the openings')
+    parser.add_argument('--games', type=int, default=None, help='number of games, two per opening')
+    parser.add_argument('--size', type=int, default=8, help='board size, with generated weights if not 8')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', help='file to write the JSON report to')
+    args = parser.parse_args()
+    try:
+        config_a, config_b = parse_config(args.a), parse_config(args.b)
+        board = board_config(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+    if config_a['name'] == config_b['name']:
+        config_b['name'] += ' (b)'
+    report = run_arena(config_a, config_b, args.plies, args.games, args.processes, board)
+    print('{0} games from {1} plies'.format(report['games'], report['plies']))
+    for c in report['configs']:
+        print('{0}: win rate {1:.3f} (+{2} ={3} -{4}), {5:.2f} ms/move, {6:.0f} nodes/move'.format(
+            c['name'], c['win_rate'], c['wins'], c['draws'], c['losses'], c['ms_per_move'], c['nodes_per_move']))
+    if args.output:
+        f = open(args.output, 'w')
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.close()
+
+
+if __name__ == '__main__':
+    main()
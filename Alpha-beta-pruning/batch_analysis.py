@@ -0,0 +1,164 @@
+"""
+Analyze many positions in one process.
+
+Positions come from a directory of input files or from a JSON-lines stream
+with one {"id": ..., "position": ...} object per line, where "position" is the
+text of an input file. One JSON line is written per position as soon as it is
+searched:
+{"id": ..., "move": "b6", "value": 15, "nodes": 4, "time_ms": 0.3, "duplicate": false}
+
+Boards may be of any size BoardConfig accepts, with generated weights, or
+all of the size of the table given with --weights.
+
+Positions that are rotations or reflections of each other (same player and
+cut_off) are searched once, in canonical form, and the root moves are mapped
+back to each of them, so the move is the one a search of the position as
+given picks; all but the first of a group are marked "duplicate". Each
+worker keeps one transposition table with canonical keys across its
+searches. This is off if the evaluation table is not symmetric.
+
+    python batch_analysis.py testcase
+    python batch_analysis.py - --mode trace < positions.jsonl
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from hw1cs561s2017 import TRACE_MODE, TT_MODE, PVS_MODE, TRACE_OFF, SearchContext, State, TraceSink, \
+    TranspositionTable, alpha_beta_search, bits_to_board, board_config, canonical_bits, move_str, \
+    parse_position, read_weights, to_original
+
+worker_table = [None, None]  # in pool workers, board configuration and transposition table shared by searches
+
+
+def read_directory(path, pattern):
+    """
+    :return: (file name, position text) for every file matching pattern
+    :rtype: generator
+    """
+    for fname in sorted(glob.glob(os.path.join(path, pattern))):
+        f = open(fname, 'r')
+        text = f.read()
+        f.close()
+        yield os.path.basename(fname), text
+
+
+def read_json_lines(f):
+    """
+    :return: (id, position text) for every non-empty line of f
+    :rtype: generator
+    """
+    for n, line in enumerate(f):
+        if line.strip():
+            job = json.loads(line)
+            yield job.get('id', n), job['position']
+
+
+def analyze(job):
+    """
+    :param job: (board configuration, x bitboard, o bitboard, player, cut_off, mode, canonical)
+    :return: (job, value of every root move, value, nodes, seconds); the
+    values of all moves tied with the best are exact
+    """
+    config, x_bits, o_bits, player, cut_off, mode, canonical = job
+    table = None
+    if canonical and mode != TRACE_MODE:
+        if worker_table[0] != config:
+            worker_table[0], worker_table[1] = config, TranspositionTable(canonical=True)
+        table = worker_table[1]
+    state = State(bits_to_board(config, x_bits, o_bits), player, config)
+    start = time.time()
+    ctx = SearchContext(cut_off, state.player, mode, table=table, trace=TraceSink(level=TRACE_OFF),
+                        exact_ties=canonical)
+    v = alpha_beta_search(ctx, state)
+    elapsed = time.time() - start
+    return job, ctx.next_actions, v, ctx.nodes, elapsed
+
+
+def original_best_action(size, next_actions, t):
+    """
+    :param size: board size
+    :param next_actions: value of every root move of a position mapped by symmetry t
+    :return: best action in the position before it was mapped, lowest
+    position first on ties like best_action; None if there is no valid action
+    :rtype: (int,int)
+    """
+    moves = [(-v, to_original(size, a, t)) for a, v in next_actions.items()]
+    if len(moves) == 0:
+        return None
+    return min(moves)[1]
+
+
+def analyze_all(positions, mode=TT_MODE, processes=None, dedupe=True, config=None):
+    """
+    Search positions over a process pool
+    :param positions: (id, position text) pairs
+    :param mode: search mode
+    :param processes: pool size, number of CPUs if None
+    :param dedupe: search symmetric positions once, if the evaluation table is symmetric
+    :param config: board configuration of every position, see parse_position
+    :type config: hw1cs561s2017.BoardConfig
+    :return: result records, in the order the searches finish
+    :rtype: generator
+    """
+    groups = {}  # job -> [(id, symmetry the job was made with)]
+    jobs = []
+    for name, text in positions:
+        state, cut_off = parse_position(text.splitlines(), config)
+        board = state.config
+        canonical = dedupe and board.symmetric
+        x_bits, o_bits, t = state.x_bits, state.o_bits, 0
+        if canonical:
+            x_bits, o_bits, t = canonical_bits(board, x_bits, o_bits)
+        job = (board, x_bits, o_bits, state.player, cut_off, mode, canonical)
+        if job not in groups:
+            groups[job] = []
+            jobs.append(job)
+        groups[job].append((name, t))
+    pool = multiprocessing.Pool(processes)
+    try:
+        for job, next_actions, v, nodes, elapsed in pool.imap_unordered(analyze, jobs):
+            for n, (name, t) in enumerate(groups[job]):
+                a = original_best_action(job[0].size, next_actions, t)
+                yield {'id': name,
+                       'move': None if a is None else move_str(a),
+                       'value': v,
+                       'nodes': nodes,
+                       'time_ms': round(elapsed * 1000.0, 3),
+                       'duplicate': n > 0}
+    finally:
+        pool.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search a batch of positions.')
+    parser.add_argument('source', help="directory of input files, or '-' for JSON lines on stdin")
+    parser.add_argument('--pattern', default='input*.txt', help='input file pattern in a directory')
+    parser.add_argument('--mode', default=TT_MODE, choices=[TRACE_MODE, TT_MODE, PVS_MODE])
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--no-dedupe', action='store_true', help='search symmetric positions separately')
+    parser.add_argument('--weights', help='evaluation table file, see read_weights, for positions of its size')
+    args = parser.parse_args()
+    config = None
+    if args.weights:
+        weights = read_weights(args.weights)
+        try:
+            config = board_config(len(weights), weights)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.source == '-':
+        positions = read_json_lines(sys.stdin)
+    else:
+        positions = read_directory(args.source, args.pattern)
+    for result in analyze_all(positions, args.mode, args.processes, not args.no_dedupe, config):
+        sys.stdout.write(json.dumps(result, sort_keys=True))
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
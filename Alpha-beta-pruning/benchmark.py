@@ -0,0 +1,170 @@
+"""
+Search benchmark over the test cases.
+
+Runs alpha_beta_search on every testcase/input*.txt at several cut_off depths
+and records nodes visited, leaves evaluated, cutoffs, time, nodes per second
+and peak memory of each run as JSON. Given an earlier result file as baseline,
+exits with status 1 if node counts grew or nodes per second dropped by more
+than the threshold. Runs are only compared if they used the same mode and
+share some (case, depth) pairs; speed is compared over the shared pairs,
+and only when those took at least --min-seconds in both, as shorter runs
+mostly measure timer noise.
+
+    python benchmark.py --output before.json
+    python benchmark.py --baseline before.json --threshold 0.1
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+from hw1cs561s2017 import TRACE_MODE, TT_MODE, PVS_MODE, TRACE_OFF, SearchContext, TraceSink, \
+    alpha_beta_search, read_from_file
+
+TESTCASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testcase')
+
+
+def run_case(fname, cut_off, mode, repeat):
+    """
+    :return: measurements of the fastest of 'repeat' searches
+    :rtype: dict
+    """
+    seconds = None
+    for r in range(repeat):
+        state, _ = read_from_file(fname)
+        ctx = SearchContext(cut_off, state.player, mode, trace=TraceSink(level=TRACE_OFF))
+        start = time.time()
+        alpha_beta_search(ctx, state)
+        elapsed = time.time() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return {'case': os.path.basename(fname),
+            'depth': cut_off,
+            'nodes': ctx.nodes,
+            'leaves': ctx.leaves,
+            'cutoffs': ctx.cutoffs,
+            'seconds': seconds,
+            'nodes_per_sec': ctx.nodes / seconds if seconds > 0 else None,
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run_case_in_process(fname, cut_off, mode, repeat):
+    """
+    Run the case in a fresh process, so that peak_rss_kb is the peak of this case
+    """
+    receiver, sender = multiprocessing.Pipe(False)
+    p = multiprocessing.Process(target=lambda: sender.send(run_case(fname, cut_off, mode, repeat)))
+    p.start()
+    result = receiver.recv()
+    p.join()
+    return result
+
+
+def run_benchmark(depths, mode=TRACE_MODE, repeat=1, pattern='input*.txt'):
+    """
+    :return: benchmark result
+    :rtype: dict
+    """
+    files = sorted(glob.glob(os.path.join(TESTCASE_DIR, pattern)))
+    if len(files) == 0 or len(depths) == 0:
+        raise ValueError('no test case matches {0} at depths {1}'.format(pattern, depths))
+    cases = [run_case_in_process(f, d, mode, repeat) for d in depths for f in files]
+    nodes = sum(c['nodes'] for c in cases)
+    seconds = sum(c['seconds'] for c in cases)
+    return {'python': platform.python_version(),
+            'mode': mode,
+            'depths': depths,
+            'cases': cases,
+            'total': {'nodes': nodes,
+                      'leaves': sum(c['leaves'] for c in cases),
+                      'cutoffs': sum(c['cutoffs'] for c in cases),
+                      'seconds': seconds,
+                      'nodes_per_sec': nodes / seconds if seconds > 0 else None,
+                      'peak_rss_kb': max(c['peak_rss_kb'] for c in cases)}}
+
+
+def regressions(result, baseline, threshold, min_seconds=1.0):
+    """
+    :param threshold: allowed relative change, e.g. 0.1 for 10%
+    :param min_seconds: shortest time the shared cases must take in both runs
+    for nodes per second to be compared
+    :return: (description of every regression against baseline, number of
+    (case, depth) pairs compared, whether nodes per second was compared)
+    :rtype: (List[str], int, bool)
+    """
+    if result['mode'] != baseline['mode']:
+        raise ValueError('baseline is for mode {0}, not {1}'.format(baseline['mode'], result['mode']))
+    found = []
+    shared = 0
+    old_cases = dict(((c['case'], c['depth']), c) for c in baseline['cases'])
+    nodes = old_nodes = 0
+    seconds = old_seconds = 0.0
+    for c in result['cases']:
+        old = old_cases.get((c['case'], c['depth']))
+        if old is None:
+            continue
+        shared += 1
+        if c['nodes'] > old['nodes'] * (1 + threshold):
+            found.append('{0} depth {1}: nodes {2} -> {3}'.format(c['case'], c['depth'], old['nodes'], c['nodes']))
+        nodes, seconds = nodes + c['nodes'], seconds + c['seconds']
+        old_nodes, old_seconds = old_nodes + old['nodes'], old_seconds + old['seconds']
+    if shared == 0:
+        raise ValueError('baseline shares no (case, depth) pair, it has depths {0}'.format(baseline['depths']))
+    timed = min(seconds, old_seconds) >= min_seconds and seconds > 0 and old_seconds > 0
+    if timed:
+        old_speed, speed = old_nodes / old_seconds, nodes / seconds
+        if speed < old_speed * (1 - threshold):
+            found.append('nodes/sec {0:.0f} -> {1:.0f}'.format(old_speed, speed))
+    return found, shared, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the search over the test cases.')
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3, 4])
+    parser.add_argument('--mode', default=TRACE_MODE, choices=[TRACE_MODE, TT_MODE, PVS_MODE])
+    parser.add_argument('--repeat', type=int, default=3, help='searches per case, the fastest is kept')
+    parser.add_argument('--output', help='file to write the JSON result to')
+    parser.add_argument('--baseline', help='earlier JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--min-seconds', type=float, default=1.0,
+                        help='shortest run time of the shared cases for nodes/sec to be compared')
+    args = parser.parse_args()
+    baseline = None
+    if args.baseline:
+        f = open(args.baseline, 'r')
+        baseline = json.load(f)
+        f.close()
+        if baseline['mode'] != args.mode:
+            parser.error('baseline is for mode {0}, not {1}'.format(baseline['mode'], args.mode))
+    try:
+        result = run_benchmark(args.depths, args.mode, args.repeat)
+    except ValueError as e:
+        parser.error(str(e))
+    total = result['total']
+    print('nodes {0} leaves {1} cutoffs {2} seconds {3:.3f} nodes/sec {4:.0f} peak rss {5} KB'.format(
+        total['nodes'], total['leaves'], total['cutoffs'], total['seconds'], total['nodes_per_sec'],
+        total['peak_rss_kb']))
+    if args.output:
+        f = open(args.output, 'w')
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.close()
+    if baseline is not None:
+        try:
+            found, shared, timed = regressions(result, baseline, args.threshold, args.min_seconds)
+        except ValueError as e:
+            parser.error(str(e))
+        print('compared {0} of {1} cases with the baseline'.format(shared, len(result['cases'])))
+        if not timed:
+            print('nodes/sec not compared: shared cases ran under {0} s'.format(args.min_seconds))
+        for line in found:
+            print('regression: ' + line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
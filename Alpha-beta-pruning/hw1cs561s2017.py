@@ -1,11 +1,12 @@
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+
 ##################################################
 # Global variable and utility functions
 Infinity = float('inf')
-Game_over = False
-Start_player = 1
-b_size = 8
-depth = 0
-cut_off = float('inf')
 evaluation = [[99, -8, 8, 6, 6, 8, -8, 99],
               [-8, -24, -4, -3, -3, -4, -24, -8],
               [8, -4, 7, 4, 4, 7, -4, 8],
@@ -14,12 +15,16 @@ evaluation = [[99, -8, 8, 6, 6, 8, -8, 99],
               [8, -4, 7, 4, 4, 7, -4, 8],
               [-8, -24, -4, -3, -3, -4, -24, -8],
               [99, -8, 8, 6, 6, 8, -8, 99]]
-traces = ['Node,Depth,Value,Alpha,Beta']  # trace for searching tree
-next_actions = {}  # all valid actions and its value
+CORNER_WEIGHTS = [row[:4] for row in evaluation[:4]]  # weights by distance to the two nearest edges
+TRACE_HEADER = 'Node,Depth,Value,Alpha,Beta'
+TRACE_OFF, TRACE_ROOT, TRACE_FULL = -1, 1, Infinity  # deepest node a TraceSink records
+TRACE_MODE = 'trace'  # plain alpha-beta, reproduces the TA trace
+TT_MODE = 'tt'  # alpha-beta with transposition table, trace differs from TRACE_MODE
+PVS_MODE = 'pvs'  # TT_MODE with zero window searches of all but the first move
 
 
-def deepcopy_2D_list(l):
-    return [x[:] for x in l]
+class SearchTimeout(Exception):
+    pass
 
 
 def value_str(x):
@@ -31,213 +36,1356 @@ def value_str(x):
         return str(x)
 
 
+##################################################
+# Bitboard tables and operations
+# A board is held as two ints, one per player, with bit i * size + j set
+# when square (i, j) holds a piece of that player. The tables depend on the
+# board size and are kept in a BoardConfig, see "Board size" below.
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1),
+              (-1, 1), (-1, -1), (1, 1), (1, -1)]
+
+
+def column_mask(j, size):
+    m = 0
+    for i in range(size):
+        m |= 1 << (i * size + j)
+    return m
+
+
+def direction_shifts(size):
+    """
+    :return: (shift, mask) for every direction, mask drops the squares that
+    wrapped around to the other side of the board
+    :rtype: List[(int, int)]
+    """
+    result = []
+    for di, dj in DIRECTIONS:
+        mask = (1 << (size * size)) - 1
+        if dj == 1:
+            mask &= ~column_mask(0, size)
+        elif dj == -1:
+            mask &= ~column_mask(size - 1, size)
+        result.append((di * size + dj, mask))
+    return result
+
+
+def square_rays(size):
+    """
+    :return: for every square, the rays toward higher squares and the rays
+    toward lower squares; a ray is the bitboard of the squares in one direction
+    from the next one up to the edge of the board, only rays of at least two
+    squares are kept since a shorter one cannot flip anything
+    :rtype: (List[List[int]], List[List[int]])
+    """
+    up, down = [], []
+    for sq in range(size * size):
+        up.append([])
+        down.append([])
+        for di, dj in DIRECTIONS:
+            ray, length = 0, 0
+            i, j = sq // size + di, sq % size + dj
+            while 0 <= i < size and 0 <= j < size:
+                ray |= 1 << (i * size + j)
+                length += 1
+                i, j = i + di, j + dj
+            if length >= 2:
+                (up if di * size + dj > 0 else down)[sq].append(ray)
+    return up, down
+
+
+def popcount(b):
+    return bin(b).count('1')
+
+
+def bits_weight(config, b):
+    """
+    :type config: BoardConfig
+    :return: sum of evaluation table weights over the squares set in b
+    :rtype: int
+    """
+    square_weights = config.square_weights
+    result = 0
+    while b:
+        m = b & -b
+        result += square_weights[m.bit_length() - 1]
+        b ^= m
+    return result
+
+
+def shift_bits(b, shift, mask):
+    if shift > 0:
+        return (b << shift) & mask
+    return (b >> -shift) & mask
+
+
+def legal_moves_bits(config, own, opp):
+    """
+    :type config: BoardConfig
+    :param own: bitboard of player to move
+    :param opp: bitboard of opponent
+    :return: bitboard of all empty squares that flip at least one opponent piece
+    :rtype: int
+    """
+    empty = ~(own | opp) & config.full_mask
+    moves = 0
+    for shift, mask in config.shifts:
+        x = shift_bits(own, shift, mask) & opp
+        while x:
+            x = shift_bits(x, shift, mask)
+            moves |= x & empty
+            x &= opp
+    return moves
+
+
+def flips_bits(config, own, opp, m):
+    """
+    :type config: BoardConfig
+    :param own: bitboard of player to move
+    :param opp: bitboard of opponent
+    :param m: bitboard with the single square the player moves to
+    :return: bitboard of opponent pieces flipped by the move
+    :rtype: int
+    """
+    sq = m.bit_length() - 1
+    flips = 0
+    for ray in config.rays_up[sq]:
+        x = ray & ~opp  # the run of opponent pieces ends at the lowest of these
+        first = x & -x
+        if first & own:
+            flips |= ray & (first - 1)
+    for ray in config.rays_down[sq]:
+        x = ray & ~opp  # and here at the highest
+        if x:
+            first = 1 << (x.bit_length() - 1)
+            if first & own:
+                flips |= ray & ~((first << 1) - 1)
+    return flips
+
+
+def board_to_bits(board):
+    """
+    :type board: int[size][size]
+    :return: (X bitboard, O bitboard)
+    :rtype: (int, int)
+    """
+    size = len(board)
+    x_bits, o_bits = 0, 0
+    for i in range(size):
+        for j in range(size):
+            if board[i][j] == 1:
+                x_bits |= 1 << (i * size + j)
+            elif board[i][j] == -1:
+                o_bits |= 1 << (i * size + j)
+    return x_bits, o_bits
+
+
+def bits_to_board(config, x_bits, o_bits):
+    """
+    :type config: BoardConfig
+    :return: board with 1 for X, -1 for O and 0 for empty squares
+    :rtype: int[size][size]
+    """
+    size = config.size
+    b = [[0 for col in range(size)] for row in range(size)]
+    for i in range(size):
+        for j in range(size):
+            m = 1 << (i * size + j)
+            if x_bits & m:
+                b[i][j] = 1
+            elif o_bits & m:
+                b[i][j] = -1
+    return b
+
+
+def bits_to_moves(config, moves):
+    """
+    :type config: BoardConfig
+    :param moves: bitboard of moves
+    :return: moves in row-major order
+    :rtype: List[(int,int)]
+    """
+    size = config.size
+    result = []
+    while moves:
+        m = moves & -moves
+        result.append(divmod(m.bit_length() - 1, size))
+        moves ^= m
+    return result
+
+
+##################################################
+# Board symmetries
+# The 8 rotations and reflections of the board. The evaluation table is the
+# same under all of them, so transformed positions have the same value.
+SYMMETRIES = [lambda i, j, n: (i, j),  # identity
+              lambda i, j, n: (j, n - i),  # rotate 90 degrees clockwise
+              lambda i, j, n: (n - i, n - j),  # rotate 180 degrees
+              lambda i, j, n: (n - j, i),  # rotate 270 degrees clockwise
+              lambda i, j, n: (i, n - j),  # mirror left to right
+              lambda i, j, n: (n - i, j),  # mirror top to bottom
+              lambda i, j, n: (j, i),  # transpose
+              lambda i, j, n: (n - j, n - i)]  # anti-transpose
+INVERSE_SYMMETRY = [0, 3, 2, 1, 4, 5, 6, 7]
+
+
+def transform_square(size, a, t):
+    """
+    :param size: board size
+    :param a: action, (int, int) or 'pass'
+    :param t: index in SYMMETRIES
+    :return: action a is mapped to by symmetry t
+    """
+    if a == 'pass':
+        return a
+    return SYMMETRIES[t](a[0], a[1], size - 1)
+
+
+def symmetry_byte_tables(size):
+    """
+    :return: tables[t][k][byte], the bitboard that the k-th byte of a bitboard
+    is mapped to by symmetry t
+    :rtype: List[List[List[int]]]
+    """
+    tables = []
+    for t in range(len(SYMMETRIES)):
+        t_tables = []
+        for k in range((size * size + 7) // 8):
+            table = [0] * 256
+            for byte in range(1, 256):
+                low = byte & -byte
+                sq = 8 * k + low.bit_length() - 1
+                moved = 0
+                if sq < size * size:
+                    i, j = transform_square(size, divmod(sq, size), t)
+                    moved = 1 << (i * size + j)
+                table[byte] = table[byte ^ low] | moved
+            t_tables.append(table)
+        tables.append(t_tables)
+    return tables
+
+
+def symmetric_weights(weights):
+    """
+    :return: whether the evaluation table is the same under the 8 board
+    symmetries, which is needed for symmetric positions to have the same value
+    :rtype: bool
+    """
+    size = len(weights)
+    return all(weights[i][j] == weights[k][l]
+               for i in range(size) for j in range(size)
+               for k, l in [transform_square(size, (i, j), t) for t in range(1, len(SYMMETRIES))])
+
+
+def transform_bits(config, b, t):
+    """
+    :type config: BoardConfig
+    :return: bitboard b mapped by symmetry t
+    :rtype: int
+    """
+    result = 0
+    for table in config.symmetry_bytes[t]:
+        result |= table[b & 0xff]
+        b >>= 8
+    return result
+
+
+def canonical_bits(config, x_bits, o_bits):
+    """
+    :type config: BoardConfig
+    :return: (X bitboard, O bitboard, t) of the smallest of the 8 symmetric
+    positions, which is the given one mapped by symmetry t
+    :rtype: (int, int, int)
+    """
+    best = (x_bits, o_bits, 0)
+    for t in range(1, len(SYMMETRIES)):
+        x, o = transform_bits(config, x_bits, t), transform_bits(config, o_bits, t)
+        if (x, o) < best[:2]:
+            best = (x, o, t)
+    return best
+
+
+def canonical_state(state):
+    """
+    :type state: State
+    :return: (canonical form of state, t); state mapped by symmetry t is the
+    canonical form, an action a in it is to_original(size, a, t) in state
+    :rtype: (State, int)
+    """
+    config = state.config
+    x, o, t = canonical_bits(config, state.x_bits, state.o_bits)
+    return State(bits_to_board(config, x, o), state.player, config), t
+
+
+def to_original(size, a, t):
+    """
+    :param size: board size
+    :param a: action in a position mapped by symmetry t
+    :return: the action in the position before it was mapped
+    """
+    return transform_square(size, a, INVERSE_SYMMETRY[t])
+
+
+##################################################
+# Zobrist hashing and transposition table
+# Random key per (color, square), plus keys for side to move, a pending pass
+# and the searching player. The per-square keys are folded into one table per
+# byte of a bitboard so that hashing a State costs a few lookups.
+EXACT, LOWER, UPPER = 0, 1, 2  # kind of value stored in a table entry
+
+
+def zobrist_keys(size):
+    """
+    :return: (keys per color and square, side to move key, pass key,
+    searching player key), the same on every call for a board size
+    :rtype: (List[List[int]], int, int, int)
+    """
+    r = random.Random(561)
+    squares = [[r.getrandbits(64) for sq in range(size * size)] for color in range(2)]
+    return squares, r.getrandbits(64), r.getrandbits(64), r.getrandbits(64)
+
+
+def zobrist_byte_tables(size, squares):
+    """
+    :param squares: keys per color and square, see zobrist_keys
+    :return: tables[color][k][byte], the xor of squares[color] over the squares
+    set in 'byte' when it is the k-th byte of a bitboard
+    :rtype: List[List[List[int]]]
+    """
+    tables = []
+    for color in range(2):
+        color_tables = []
+        for k in range((size * size + 7) // 8):
+            table = [0] * 256
+            for byte in range(1, 256):
+                low = byte & -byte
+                sq = 8 * k + low.bit_length() - 1
+                table[byte] = table[byte ^ low] ^ (squares[color][sq] if sq < size * size else 0)
+            color_tables.append(table)
+        tables.append(color_tables)
+    return tables
+
+
+def zobrist_key(state):
+    """
+    :type state: State
+    :return: Zobrist hash of the pieces and the player to move
+    :rtype: int
+    """
+    return zobrist_bits(state.config, state.x_bits, state.o_bits, state.player)
+
+
+def zobrist_bits(config, x_bits, o_bits, player):
+    """
+    :type config: BoardConfig
+    :return: Zobrist hash of the pieces and the player to move
+    :rtype: int
+    """
+    key = 0 if player == 1 else config.zobrist_player
+    x_bytes, o_bytes = config.zobrist_bytes
+    for x_table, o_table in zip(x_bytes, o_bytes):
+        key ^= x_table[x_bits & 0xff] ^ o_table[o_bits & 0xff]
+        x_bits >>= 8
+        o_bits >>= 8
+    return key
+
+
+class TranspositionTable(object):
+    def __init__(self, size_bits=16, canonical=False):
+        """
+        Fixed size table with two entries per bucket: a depth-preferred entry
+        that is only replaced by an equal or deeper search (or by any search
+        once the entry is from an older generation), and an always-replace entry.
+        Keys do not tell board configurations apart, so a table is only for
+        searches of one BoardConfig.
+        :param size_bits: log2 of the number of buckets
+        :param canonical: key positions by their canonical form, so the 8
+        symmetric forms of a position share an entry
+        :type size_bits: int
+        :type canonical: bool
+        """
+        self.canonical = canonical
+        self.size = 1 << size_bits
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+
+    def probe(self, key):
+        """
+        :return: entry (key, depth, value, kind, move, generation) or None
+        :rtype: tuple
+        """
+        self.probes += 1
+        i = key & (self.size - 1)
+        entry = self.deep[i]
+        if entry is None or entry[0] != key:
+            entry = self.recent[i]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, value, kind, move):
+        i = key & (self.size - 1)
+        entry = (key, depth, value, kind, move, self.generation)
+        old = self.deep[i]
+        if old is None or old[0] == key or depth >= old[1] or old[5] != self.generation:
+            self.deep[i] = entry
+        else:
+            self.recent[i] = entry
+
+
+def tt_key(table, state, now, start_player):
+    """
+    :return: (key, t), the key is for state mapped by symmetry t
+    :rtype: (int, int)
+    """
+    config = state.config
+    x_bits, o_bits, t = state.x_bits, state.o_bits, 0
+    if table.canonical:
+        x_bits, o_bits, t = canonical_bits(config, x_bits, o_bits)
+    key = zobrist_bits(config, x_bits, o_bits, state.player)
+    if now == 'pass':
+        key ^= config.zobrist_pass
+    if start_player == -1:
+        key ^= config.zobrist_start
+    return key, t
+
+
+def tt_value(entry, remaining, alpha, beta):
+    """
+    Entries are only used at the same remaining depth, so the table never
+    changes the value of a fixed depth search
+    :return: stored value if it decides the node for window (alpha, beta), else None
+    """
+    if entry[1] != remaining:
+        return None
+    v, kind = entry[2], entry[3]
+    if kind == EXACT or (kind == LOWER and v >= beta) or (kind == UPPER and v <= alpha):
+        return v
+    return None
+
+
+def tt_move(size, entry, t):
+    """
+    :param size: board size
+    :return: best move of a table entry for a key made with symmetry t, None if no entry
+    """
+    if entry is None or entry[4] is None:
+        return None
+    return to_original(size, entry[4], t)
+
+
+def tt_store(size, table, key, t, remaining, v, alpha, beta, move):
+    """
+    :param size: board size
+    :param t: symmetry the key was made with
+    :param alpha: alpha when the node was entered
+    :param beta: beta when the node was entered
+    """
+    if move is not None:
+        move = transform_square(size, move, t)
+    if v <= alpha:
+        kind = UPPER
+    elif v >= beta:
+        kind = LOWER
+    else:
+        kind = EXACT
+    table.store(key, remaining, v, kind, move)
+
+
+##################################################
+# Move ordering
+class MoveOrdering(object):
+    def __init__(self, hash_move=True, killers=True, history=True, static=True):
+        """
+        Orders moves for the non-trace search modes, best candidates first:
+        hash move from the transposition table, then the killer moves of the
+        ply, then by history score, then by evaluation table weight.
+        Each heuristic can be switched off; with all off, moves keep row-major order.
+        :type hash_move: bool
+        :type killers: bool
+        :type history: bool
+        :type static: bool
+        """
+        self.use_hash_move = hash_move
+        self.use_killers = killers
+        self.use_history = history
+        self.use_static = static
+        self.killers = {}  # ply -> [killer move, older killer move]
+        self.history = {}  # move -> sum of remaining depth ** 2 over its cutoffs
+        self.cutoffs = 0  # nodes that failed high (or low)
+        self.first_move_cutoffs = 0  # of those, nodes cut by the first move searched
+
+    def order(self, acts, ply, hash_move, weights):
+        """
+        :param acts: valid actions in row-major order
+        :param ply: distance from the root
+        :param hash_move: best move stored in the transposition table or None
+        :param weights: evaluation table, BoardConfig.evaluation
+        :rtype: List[(int,int)]
+        """
+        if len(acts) < 2:
+            return acts
+        if not self.use_hash_move:
+            hash_move = None
+        killers = self.killers.get(ply, []) if self.use_killers else []
+        history = self.history if self.use_history else {}
+        use_static = self.use_static
+
+        def score(a):
+            return (a == hash_move,
+                    len(killers) - killers.index(a) if a in killers else 0,
+                    history.get(a, 0),
+                    weights[a[0]][a[1]] if use_static else 0)
+
+        return sorted(acts, key=score, reverse=True)
+
+    def cutoff(self, a, index, ply, remaining):
+        """
+        Record that action 'a', searched as the index-th move, caused a cutoff
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if a == 'pass':
+            return
+        killers = self.killers.setdefault(ply, [])
+        if a not in killers:
+            killers.insert(0, a)
+            del killers[2:]
+        if remaining != Infinity:
+            self.history[a] = self.history.get(a, 0) + remaining * remaining
+
+    def first_move_cutoff_rate(self):
+        if self.cutoffs == 0:
+            return 0.0
+        return float(self.first_move_cutoffs) / self.cutoffs
+
+
+##################################################
+# Endgame solver
+# Searches to the end of the game for the final disc differential. Moves are
+# ordered fastest-first (fewest replies for the opponent) while many squares
+# are empty, and by region parity near the end: squares in a quadrant with an
+# odd number of empty squares come first.
+FASTEST_FIRST_EMPTIES = 7  # use fastest-first ordering above this many empty squares
+
+
+def quadrants(size):
+    half = size // 2
+    return [(sq // size >= half) * 2 + (sq % size >= half) for sq in range(size * size)]
+
+
+class EndgameSolver(object):
+    def __init__(self, deadline=None):
+        """
+        :param deadline: time.time() at which solve raises SearchTimeout, no limit if None
+        :type deadline: float
+        """
+        self.deadline = deadline
+        self.config = None  # board configuration of the position being solved
+        self.nodes = 0  # nodes visited
+
+    def solve(self, state):
+        """
+        :param state: position to solve, left unchanged
+        :type state: State
+        :return: (best action, final disc differential for State.player with
+        best play); lowest position first on ties, None if there is no valid move
+        :rtype: ((int,int), int)
+        """
+        self.config = state.config
+        size = self.config.size
+        own, opp = state.pieces()
+        empties = [sq for sq in range(size * size) if not (own | opp) & (1 << sq)]
+        moves = self.ordered_moves(own, opp, empties)
+        if len(moves) == 0:
+            return None, self.negamax(own, opp, empties, -Infinity, Infinity, False)
+        best, best_v = None, -Infinity
+        for sq, f in moves:
+            k = empties.index(sq)
+            del empties[k]
+            m = 1 << sq
+            if best is None:
+                v = -self.negamax(opp ^ f, own | m | f, empties, -Infinity, Infinity, False)
+            else:
+                # a move before the best one has to prove a tie to take over
+                a = best_v if sq > best else best_v - 1
+                v = -self.negamax(opp ^ f, own | m | f, empties, -a - 1, -a, False)
+                if v > a:
+                    v = -self.negamax(opp ^ f, own | m | f, empties, -Infinity, -a, False)
+            empties.insert(k, sq)
+            if v > best_v or (v == best_v and sq < best):
+                best, best_v = sq, v
+        return divmod(best, size), best_v
+
+    def negamax(self, own, opp, empties, alpha, beta, passed):
+        """
+        Principal variation search, every move after the first is tried with
+        a null window first
+        :param own: bitboard of player to move
+        :param opp: bitboard of opponent
+        :param empties: empty squares, restored before returning
+        :param passed: whether the opponent just passed
+        :return: final disc differential for the player to move, exact if
+        inside (alpha, beta), otherwise a bound on the same side
+        :rtype: int
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 255 == 0 and time.time() > self.deadline:
+            raise SearchTimeout()
+        moves = self.ordered_moves(own, opp, empties)
+        if len(moves) == 0:
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self.negamax(opp, own, empties, -beta, -alpha, True)
+        v = -Infinity
+        for index, (sq, f) in enumerate(moves):
+            k = empties.index(sq)
+            del empties[k]
+            m = 1 << sq
+            if index == 0:
+                child_v = -self.negamax(opp ^ f, own | m | f, empties, -beta, -alpha, False)
+            else:
+                child_v = -self.negamax(opp ^ f, own | m | f, empties, -alpha - 1, -alpha, False)
+                if alpha < child_v < beta:
+                    child_v = -self.negamax(opp ^ f, own | m | f, empties, -beta, -child_v, False)
+            empties.insert(k, sq)
+            if child_v > v:
+                v = child_v
+            if v > alpha:
+                alpha = v
+            if alpha >= beta:
+                break
+        return v
+
+    def ordered_moves(self, own, opp, empties):
+        """
+        :return: (square, flipped squares) of every valid move, best candidates first
+        :rtype: List[(int, int)]
+        """
+        config = self.config
+        moves = []
+        for sq in empties:
+            f = flips_bits(config, own, opp, 1 << sq)
+            if f:
+                moves.append((sq, f))
+        if len(moves) < 2:
+            return moves
+        if len(empties) > FASTEST_FIRST_EMPTIES:
+            moves.sort(key=lambda move: self.mobility_after(own, opp, move))
+        else:
+            quadrant = config.quadrants
+            count = [0, 0, 0, 0]
+            for sq in empties:
+                count[quadrant[sq]] += 1
+            moves.sort(key=lambda move: count[quadrant[move[0]]] % 2 == 0)
+        return moves
+
+    def mobility_after(self, own, opp, move):
+        """
+        :return: number of valid moves of the opponent after 'move'
+        :rtype: int
+        """
+        sq, f = move
+        return popcount(legal_moves_bits(self.config, opp ^ f, own | f | (1 << sq)))
+
+
+##################################################
+# Board size
+# A BoardConfig holds every table above that depends on the board size and
+# the evaluation table. board_config builds one once per size and table;
+# each State refers to its own, so boards of different sizes can be searched
+# side by side in one process.
+MIN_SIZE, MAX_SIZE = 4, 26  # columns are written as letters
+
+
+def generated_weights(size):
+    """
+    :return: evaluation table for a size x size board: every square gets the
+    weight of the 8 x 8 square at the same distances from the nearest edges,
+    distances over 3 count as 3; for size 8 this is the homework table
+    :rtype: int[size][size]
+    """
+    return [[CORNER_WEIGHTS[min(i, size - 1 - i, 3)][min(j, size - 1 - j, 3)] for j in range(size)]
+            for i in range(size)]
+
+
+def read_weights(fname):
+    """
+    :param fname: file with one row of the evaluation table per line, the
+    weights separated by spaces or commas
+    :return: evaluation table
+    :rtype: int[size][size]
+    """
+    f = open(fname, 'r')
+    weights = [[int(w) for w in line.replace(',', ' ').split()] for line in f if line.strip()]
+    f.close()
+    return weights
+
+
+class BoardConfig(object):
+    def __init__(self, size=8, weights=None):
+        """
+        Tables for size x size boards, use board_config to share them.
+        Symmetric positions are only equivalent, for canonical transposition
+        table keys, batch deduplication and the opening book, if the
+        evaluation table is the same under the 8 board symmetries.
+        :param size: even number of rows and columns, MIN_SIZE to MAX_SIZE
+        :param weights: evaluation table, generated_weights(size) if None
+        :type size: int
+        :type weights: int[size][size]
+        """
+        if size % 2 != 0 or not MIN_SIZE <= size <= MAX_SIZE:
+            raise ValueError('board size must be even, from {0} to {1}: {2}'.format(MIN_SIZE, MAX_SIZE, size))
+        if weights is None:
+            weights = generated_weights(size)
+        if len(weights) != size or any(len(row) != size for row in weights):
+            raise ValueError('evaluation table is not {0} x {0}'.format(size))
+        self.size = size
+        self.evaluation = [list(row) for row in weights]
+        self.key = (size, tuple(tuple(row) for row in weights))
+        self.key_hash = hash(self.key)
+        self.full_mask = (1 << (size * size)) - 1
+        self.shifts = direction_shifts(size)
+        self.rays_up, self.rays_down = square_rays(size)
+        self.square_weights = [self.evaluation[sq // size][sq % size] for sq in range(size * size)]
+        self.symmetry_bytes = symmetry_byte_tables(size)
+        self.symmetric = symmetric_weights(self.evaluation)
+        self.zobrist, self.zobrist_player, self.zobrist_pass, self.zobrist_start = zobrist_keys(size)
+        self.zobrist_bytes = zobrist_byte_tables(size, self.zobrist)
+        self.quadrants = quadrants(size)
+
+    def __eq__(self, other):
+        return isinstance(other, BoardConfig) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __reduce__(self):
+        # pickled as size and table, so a pool worker builds the tables once
+        return board_config, (self.size, self.evaluation)
+
+
+board_configs = {}  # (size, evaluation table as tuples) -> BoardConfig
+
+
+def board_config(size=8, weights=None):
+    """
+    :param size: board size, see BoardConfig
+    :param weights: evaluation table, generated_weights(size) if None; for
+    size 8 that is the homework table
+    :return: the BoardConfig for size and weights, built on the first call
+    :rtype: BoardConfig
+    """
+    if weights is None:
+        weights = generated_weights(size)
+    key = (size, tuple(tuple(row) for row in weights))
+    config = board_configs.get(key)
+    if config is None:
+        config = BoardConfig(size, weights)
+        board_configs[key] = config
+    return config
+
+
 ##################################################
 
 
 def main():
-    global cut_off
-    S = read_from_file('input.txt')
-    alpha_beta_search(S)
-    S = next_state(S)
-    write_to_file('output.txt', S)
+    S, cut_off = read_from_file('input.txt')
+    trace = TraceSink(tempfile.TemporaryFile('w+'))
+    ctx = SearchContext(cut_off, S.player, trace=trace)
+    alpha_beta_search(ctx, S)
+    S = next_state(ctx, S)
+    write_to_file('output.txt', S, trace)
+    trace.close()
 
 
-class State:
-    def __init__(self, board, player):
+class State(object):
+    def __init__(self, board, player, config=None):
         """
         :param board: current board
         :param player: current player to move, -1 or 1
-        :type board: int[b_size][b_size]
+        :param config: board configuration, board_config(len(board)) if None
+        :type board: int[size][size]
         :type player: int
+        :type config: BoardConfig
         """
-        self.board = board
+        self.config = config if config is not None else board_config(len(board))
+        self.x_bits = 0  # bitboard of X pieces, bit i * size + j is square (i, j)
+        self.o_bits = 0  # bitboard of O pieces
+        self.score = 0  # evaluation table weights of X pieces minus those of O pieces
+        self.load_board(board)
         self.player = player
+        self.undo = []  # (placed square, flipped squares, score change) of every move made
+
+    def to_board(self):
+        """
+        :return: a new list board built from the bitboards, changing it does not change the state
+        :rtype: int[size][size]
+        """
+        return bits_to_board(self.config, self.x_bits, self.o_bits)
+
+    def load_board(self, board):
+        """
+        Replace the pieces with those of a list board
+        :type board: int[size][size]
+        """
+        if len(board) != self.config.size:
+            raise ValueError('board is not {0} x {0}'.format(self.config.size))
+        self.x_bits, self.o_bits = board_to_bits(board)
+        self.score = bits_weight(self.config, self.x_bits) - bits_weight(self.config, self.o_bits)
+
+    def pieces(self):
+        """
+        :return: (bitboard of player to move, bitboard of opponent)
+        :rtype: (int, int)
+        """
+        if self.player == 1:
+            return self.x_bits, self.o_bits
+        return self.o_bits, self.x_bits
+
+    def set_pieces(self, own, opp):
+        if self.player == 1:
+            self.x_bits, self.o_bits = own, opp
+        else:
+            self.o_bits, self.x_bits = own, opp
+
+    def legal_moves(self):
+        """
+        :return: bitboard of all squares State.player can move to
+        :rtype: int
+        """
+        own, opp = self.pieces()
+        return legal_moves_bits(self.config, own, opp)
 
     def is_valid_pos(self, i, j):
-        if self.board[i][j] != 0:
-            return False
-        result = False
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                      (-1, 1), (-1, -1), (1, 1), (1, -1)]
-        for di, dj in directions:
-            result = result or self.check_by_direction(i, j, di, dj)
-        return result
-
-    def check_by_direction(self, i, j, di, dj):
-        i, j = i + di, j + dj
-        if i >= b_size or i < 0 or j >= b_size or j < 0:
-            return False
-        if self.board[i][j] == self.player or self.board[i][j] == 0:
-            return False
-        i, j = i + di, j + dj
-        while b_size > i >= 0 and b_size > j >= 0:
-            if self.board[i][j] == self.player:
-                return True
-            if self.board[i][j] == 0:
-                return False
-            i, j = i + di, j + dj
-        return False
+        own, opp = self.pieces()
+        m = 1 << (i * self.config.size + j)
+        return (own | opp) & m == 0 and flips_bits(self.config, own, opp, m) != 0
 
     def update_board(self, i, j):
-        self.board[i][j] = self.player
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                      (-1, 1), (-1, -1), (1, 1), (1, -1)]
-        for di, dj in directions:
-            if self.check_by_direction(i, j, di, dj):
-                self.update_by_direction(i, j, di, dj)
+        config = self.config
+        own, opp = self.pieces()
+        sq = i * config.size + j
+        m = 1 << sq
+        f = flips_bits(config, own, opp, m)
+        self.set_pieces(own | m | f, opp ^ f)
+        self.score += self.player * (config.square_weights[sq] + 2 * bits_weight(config, f))
         return
 
-    def update_by_direction(self, i, j, di, dj):
-        i, j = i + di, j + dj
-        while b_size > i >= 0 and b_size > j >= 0:
-            if self.board[i][j] != self.player:
-                self.board[i][j] = self.player
-                i, j = i + di, j + dj
-            else:
-                return
+    def make_move(self, a):
+        """
+        Place a piece for State.player at position 'a' in place and pass the turn,
+        recording what changed so that unmake_move can restore it
+        :param a: action
+        :type a: (int,int) or 'pass'
+        """
+        m, f, delta = 0, 0, 0
+        if a != 'pass':
+            config = self.config
+            own, opp = self.pieces()
+            sq = a[0] * config.size + a[1]
+            m = 1 << sq
+            f = flips_bits(config, own, opp, m)
+            self.set_pieces(own | m | f, opp ^ f)
+            # the placed piece adds its weight, a flipped one moves its weight to the other side
+            delta = self.player * (config.square_weights[sq] + 2 * bits_weight(config, f))
+            self.score += delta
+        self.undo.append((m, f, delta))
+        self.player = - self.player
+
+    def unmake_move(self):
+        """Take back the last move made by make_move"""
+        m, f, delta = self.undo.pop()
+        self.player = - self.player
+        own, opp = self.pieces()
+        self.set_pieces(own ^ m ^ f, opp | f)
+        self.score -= delta
+
+
+class TraceSink(object):
+    def __init__(self, out=None, level=TRACE_FULL):
+        """
+        Receives the trace line of every visited node as the search goes
+        :param out: file the lines are written to through its buffer, kept in
+        a list if None
+        :param level: TRACE_OFF, TRACE_ROOT (root and its children) or TRACE_FULL
+        :type out: file
+        :type level: int
+        """
+        self.out = out
+        self.level = level
+        self.lines = []
+        self.count = 0  # lines added
+        self.add(TRACE_HEADER)
+
+    def add(self, line):
+        if self.out is None:
+            self.lines.append(line)
+        else:
+            if self.count > 0:
+                self.out.write('\n')
+            self.out.write(line)
+        self.count += 1
+
+    def write_to(self, f):
+        """Copy the whole trace to file f"""
+        if self.out is None:
+            f.write('\n'.join(self.lines))
+            return
+        self.out.flush()
+        self.out.seek(0)
+        shutil.copyfileobj(self.out, f)
+        self.out.seek(0, 2)
 
+    def close(self):
+        if self.out is not None:
+            self.out.close()
 
-def max_value(state, alpha, beta, now):
+
+class SearchContext(object):
+    def __init__(self, cut_off=Infinity, start_player=1, mode=TRACE_MODE, ordering=None, table=None,
+                 deadline=None, trace=None, endgame_empties=0, leaf_evaluator=None, book=None,
+                 guess=None, aspiration=0, exact_ties=False, config=None):
+        """
+        Everything one search reads and updates, passed through max_value and
+        min_value so that any number of searches can run in one process
+        :param cut_off: depth limit
+        :param start_player: player to move at the root, values are from its point of view
+        :param mode: TRACE_MODE, TT_MODE or PVS_MODE
+        :param ordering: move ordering for modes other than TRACE_MODE, a new
+        MoveOrdering with all heuristics if None
+        :param table: transposition table for TT_MODE and PVS_MODE, a new TranspositionTable if None
+        :param deadline: time.time() at which the search raises SearchTimeout, no limit if None
+        :param trace: where the trace goes, a new TraceSink keeping every line in memory if None
+        :param endgame_empties: outside TRACE_MODE, solve the game exactly with
+        EndgameSolver when the root has at most this many empty squares, never if 0
+        :param leaf_evaluator: outside TRACE_MODE, callable (state, actions, player)
+        returning the integer values of all children of a node on the last ply,
+        e.g. vector_eval.BatchEvaluator, also called with ['pass'] to score a
+        game over leaf; leaves use utility if None
+        :param book: outside TRACE_MODE, opening book looked up before searching,
+        any object with lookup(state) returning (action, value) or None,
+        e.g. opening_book.OpeningBook
+        :param guess: outside TRACE_MODE, expected root value, e.g. that of the previous iteration
+        :param aspiration: outside TRACE_MODE, search the root with window
+        (guess - aspiration, guess + aspiration) first and again with the full
+        window if the value falls outside; full window only if 0 or guess is None
+        :param exact_ties: search every root move with alpha one below the best
+        value so far, so that next_actions holds the exact value of every move
+        tied with the best and ties can be broken in any orientation, e.g.
+        after searching the canonical form of a position; changes the trace
+        :param config: board configuration of the positions searched, that of
+        the first state searched if None
+        :type cut_off: int
+        :type start_player: int
+        :type mode: str
+        :type ordering: MoveOrdering
+        :type table: TranspositionTable
+        :type deadline: float
+        :type trace: TraceSink
+        :type endgame_empties: int
+        :type leaf_evaluator: callable
+        :type book: opening_book.OpeningBook
+        :type guess: int
+        :type aspiration: int
+        :type exact_ties: bool
+        :type config: BoardConfig
+        """
+        self.cut_off = cut_off
+        self.start_player = start_player
+        self.mode = mode
+        self.ordering = None
+        self.table = None
+        if mode != TRACE_MODE:
+            self.ordering = ordering if ordering is not None else MoveOrdering()
+        if mode == TT_MODE or mode == PVS_MODE:
+            self.table = table if table is not None else TranspositionTable()
+        self.deadline = deadline
+        self.endgame_empties = endgame_empties
+        self.leaf_evaluator = leaf_evaluator if mode != TRACE_MODE else None
+        self.book = book if mode != TRACE_MODE else None
+        self.guess = guess if mode != TRACE_MODE else None
+        self.aspiration = aspiration
+        self.exact_ties = exact_ties
+        self.config = config
+        self.depth = 0
+        self.game_over = False
+        self.nodes = 0  # nodes visited
+        self.leaves = 0  # nodes evaluated by utility
+        self.cutoffs = 0  # nodes left before searching all of their moves
+        self.depth_limited = False  # whether some leaf was cut off by depth rather than by game over
+        self.trace = trace if trace is not None else TraceSink()  # trace for searching tree
+        self.next_actions = {}  # all valid actions and its value
+
+
+def negamax(ctx, state, alpha, beta, now):
     """
-    Recursive alpha-beta pruning function
+    Recursive alpha-beta pruning function for max and min nodes alike. Values
+    and the window are for State.player, that is negated at min nodes, while
+    the trace shows them for ctx.start_player as max_value and min_value did.
+    :param ctx: search in progress
     :param state: state after placing a piece at position 'now'
-    :param alpha: alpha in a-b pruning
-    :param beta: beta in a-b pruning
+    :param alpha: alpha in a-b pruning, for State.player
+    :param beta: beta in a-b pruning, for State.player
     :param now: last action taken
+    :type ctx: SearchContext
     :type state: State
     :type alpha: int
     :type beta: int
     :type now: (int, int)
 
-    :return: value
+    :return: value for State.player
     :rtype: int
     """
-    global depth, Game_over
-    acts = actions(state)
-    if Game_over or depth >= cut_off:  # Terminal test
-        v = utility(state)
-        keep_trace(now, depth, v, alpha, beta)
+    ctx.nodes = ctx.nodes + 1
+    if ctx.deadline is not None and ctx.nodes & 255 == 0 and time.time() > ctx.deadline:
+        raise SearchTimeout()
+    sign = 1 if state.player == ctx.start_player else -1  # 1 at max nodes, -1 at min nodes
+    depth = ctx.depth
+    if ctx.game_over or depth >= ctx.cut_off:  # Terminal test
+        ctx.depth_limited = ctx.depth_limited or not ctx.game_over
+        ctx.leaves = ctx.leaves + 1
+        if ctx.leaf_evaluator is not None:  # game over, on the same scale as the other leaves
+            v = ctx.leaf_evaluator(state, ['pass'], state.player)[0]
+        else:
+            v = utility(state, state.player)
+        trace_node(ctx, now, sign, v, alpha, beta)
         return v
+    acts = actions(state)
+    key, best, table = None, None, ctx.table
+    remaining = ctx.cut_off - depth
+    if table is not None:
+        key, sym = tt_key(table, state, now, ctx.start_player)
+        entry = table.probe(key)
+        if now != 'root':
+            v = None if entry is None else tt_value(entry, remaining, alpha, beta)
+            if v is not None:
+                trace_node(ctx, now, sign, v, alpha, beta)
+                return v
+        acts = ctx.ordering.order(acts, depth, tt_move(ctx.config.size, entry, sym), ctx.config.evaluation)
+    alpha_0 = alpha
     v = - Infinity
-    keep_trace(now, depth, v, alpha, beta)
+    trace_node(ctx, now, sign, v, alpha, beta)
     if len(acts) == 0 and now == 'pass':
         acts.append('pass')
-        Game_over = True
+        ctx.game_over = True
     elif len(acts) == 0 and now != 'pass':
         acts.append('pass')
     else:
-        Game_over = False
-    for a in acts:
-        Game_over = False
-        depth = depth + 1
-        copy, player = deepcopy_2D_list(state.board), state.player
-        v = max(v, min_value(take_action(state, a), alpha, beta, a))
-        depth = depth - 1
-        state.board, state.player = deepcopy_2D_list(copy), player
+        ctx.game_over = False
+    if ctx.leaf_evaluator is not None and depth == ctx.cut_off - 1:
+        values = leaf_values(ctx, state, acts)
+        v = max(values)
+        best = acts[values.index(v)]
+        if now == 'root':
+            for a, child_v in zip(acts, values):
+                if a != 'pass':
+                    ctx.next_actions[a] = child_v
+        trace_node(ctx, now, sign, v, max(alpha, v), beta)
+        if key is not None:
+            tt_store(ctx.config.size, table, key, sym, remaining, v, alpha_0, beta, best)
+        return v
+    trace_mode = ctx.mode == TRACE_MODE
+    pvs = ctx.mode == PVS_MODE
+    root = now == 'root'
+    exact_ties = root and ctx.exact_ties
+    make_move, unmake_move = state.make_move, state.unmake_move
+    for index, a in enumerate(acts):
+        if sign == 1:
+            ctx.game_over = False
+        ctx.depth = depth + 1
+        # root moves may come out of position order, a move before the best one
+        # so far has to prove a tie to take over, values are integers
+        ties = root and best is not None and a < best
+        low = alpha - 1 if ties or exact_ties else alpha
+        make_move(a)
+        if pvs and index > 0:
+            # prove with a zero window that the move is no better than the best so far
+            child_v = - negamax(ctx, state, - low - 1, - low, a)
+            if low < child_v < beta:
+                ctx.game_over = False
+                child_v = - negamax(ctx, state, - beta, - low, a)
+        else:
+            child_v = - negamax(ctx, state, - beta, - low, a)
+        unmake_move()
+        ctx.depth = depth
+        if sign == -1 and not trace_mode:
+            ctx.game_over = False  # only the 'pass' child ends the game, do not leak it to siblings
+        if child_v > v or (ties and child_v == v):
+            v, best = child_v, a
         if v >= beta:
-            keep_trace(now, depth, v, alpha, beta)
-            alpha = max(alpha, v)
+            ctx.cutoffs = ctx.cutoffs + 1
+            trace_node(ctx, now, sign, v, alpha, beta)
+            if key is not None:
+                tt_store(ctx.config.size, table, key, sym, remaining, v, alpha_0, beta, best)
+                ctx.ordering.cutoff(a, index, depth, remaining)
             return v
-        alpha = max(alpha, v)
-        keep_trace(now, depth, v, alpha, beta)
+        if v > alpha:
+            alpha = v
+        trace_node(ctx, now, sign, v, alpha, beta)
+    if key is not None:
+        tt_store(ctx.config.size, table, key, sym, remaining, v, alpha_0, beta, best)
     return v
 
 
-def min_value(state, alpha, beta, now):
+def max_value(ctx, state, alpha, beta, now):
     """
-    Recursive alpha-beta pruning function
-    :param state: state after placing a piece at position 'now'
-    :param alpha: alpha in a-b pruning
-    :param beta: beta in a-b pruning
-    :param now: last action taken
-    :type state: State
-    :type alpha: int
-    :type beta: int
-    :type now: (int, int)
+    :param state: state with ctx.start_player to move
+    :return: value for ctx.start_player, see negamax
+    :rtype: int
+    """
+    if ctx.config is None:
+        ctx.config = state.config
+    return negamax(ctx, state, alpha, beta, now)
 
-    :return: value
+
+def min_value(ctx, state, alpha, beta, now):
+    """
+    :param state: state with the opponent of ctx.start_player to move
+    :return: value for ctx.start_player, see negamax
     :rtype: int
     """
-    global depth, Game_over
-    acts = actions(state)
-    if Game_over or depth >= cut_off:  # Terminal test
-        v = utility(state)
-        keep_trace(now, depth, v, alpha, beta)
-        return v
-    v = Infinity
-    keep_trace(now, depth, v, alpha, beta)
-    if len(acts) == 0 and now == 'pass':
-        acts.append('pass')
-        Game_over = True
-    elif len(acts) == 0 and now != 'pass':
-        acts.append('pass')
+    if ctx.config is None:
+        ctx.config = state.config
+    return - negamax(ctx, state, - beta, - alpha, now)
+
+
+def trace_node(ctx, a, sign, v, alpha, beta):
+    """
+    keep_trace for a negamax node, with value and window turned back to
+    ctx.start_player's point of view
+    """
+    if sign == 1:
+        keep_trace(ctx, a, ctx.depth, v, alpha, beta)
     else:
-        Game_over = False
-    for a in acts:
-        depth = depth + 1
-        copy, player = deepcopy_2D_list(state.board), state.player
-        v = min(v, max_value(take_action(state, a), alpha, beta, a))
-        depth = depth - 1
-        state.board, state.player = deepcopy_2D_list(copy), player
-        if v <= alpha:
-            keep_trace(now, depth, v, alpha, beta)
-            beta = min(beta, v)
-            return v
-        beta = min(beta, v)
-        keep_trace(now, depth, v, alpha, beta)
-    return v
+        keep_trace(ctx, a, ctx.depth, - v, - beta, - alpha)
+
+
+def leaf_values(ctx, state, acts):
+    """
+    Value of every child of a node on the last ply, all scored in one call
+    to ctx.leaf_evaluator. The children are not traced.
+    :type ctx: SearchContext
+    :type state: State
+    :param acts: actions of State.player, may be ['pass']
+    :return: values for State.player
+    :rtype: List[int]
+    """
+    ctx.nodes = ctx.nodes + len(acts)
+    ctx.leaves = ctx.leaves + len(acts)
+    ctx.depth_limited = True
+    ctx.game_over = False
+    return ctx.leaf_evaluator(state, acts, state.player)
 
 
-def alpha_beta_search(state):
+def alpha_beta_search(ctx, state):
     """
     Initial call
+    :param ctx: new search
     :param state: initial state
+    :type ctx: SearchContext
     :type state: State
 
-    :return: value
+    :return: value, final disc differential if the endgame solver was used,
+    value stored in the book if the position was found there
     :rtype: int
     """
-    v = max_value(state, -Infinity, Infinity, 'root')
+    if ctx.config is None:
+        ctx.config = state.config
+    elif ctx.config != state.config:
+        raise ValueError('state is not of the board configuration of the search')
+    if ctx.book is not None:
+        hit = ctx.book.lookup(state)
+        if hit is not None:
+            a, v = hit
+            if a != 'pass':
+                ctx.next_actions[a] = v
+            return v
+    empties = ctx.config.size ** 2 - popcount(state.x_bits | state.o_bits)
+    if ctx.mode != TRACE_MODE and 0 < ctx.endgame_empties and empties <= ctx.endgame_empties:
+        solver = EndgameSolver(ctx.deadline)
+        a, v = solver.solve(state)
+        ctx.nodes = ctx.nodes + solver.nodes
+        if a is not None:
+            ctx.next_actions[a] = v
+        return v
+    if ctx.table is not None:
+        ctx.table.new_search()
+    if ctx.guess is not None and ctx.aspiration > 0:
+        alpha, beta = ctx.guess - ctx.aspiration, ctx.guess + ctx.aspiration
+        v = max_value(ctx, state, alpha, beta, 'root')
+        if alpha < v < beta:
+            return v
+        ctx.next_actions = {}  # root values outside the window are only bounds
+        ctx.game_over = False
+    v = max_value(ctx, state, -Infinity, Infinity, 'root')
     return v
 
 
-def utility(state):
+def iterative_deepening_search(state, budget_ms, max_depth=None, table=None, endgame_empties=0,
+                               book=None, mode=TT_MODE, aspiration=0):
+    """
+    Run alpha_beta_search with cut_off 1, 2, ... until the time budget
+    runs out. Unless max_depth is 1, the endgame solver is only tried from
+    cut_off 2 on, so that a move is known if it runs out of time. The table
+    carries the principal variation of each iteration over as the first move
+    to search in the next one, killer and history scores are kept across
+    iterations too.
+    :param state: initial state, left unchanged
+    :param budget_ms: time budget in milliseconds
+    :param max_depth: deepest cut_off to try, unlimited if None
+    :param table: transposition table to use, a new one if None
+    :param endgame_empties: solve exactly at most this many empty squares, see SearchContext
+    :param book: opening book to look up first, see SearchContext
+    :param mode: TT_MODE or PVS_MODE
+    :param aspiration: half width of the root window around the value of the
+    previous iteration, full window if 0
+    :type state: State
+    :type budget_ms: int
+    :type max_depth: int
+    :type table: TranspositionTable
+    :type endgame_empties: int
+    :type book: opening_book.OpeningBook
+    :type mode: str
+    :type aspiration: int
+
+    :return: (best action, value, cut_off) of the deepest finished iteration,
+    (None, None, 0) if none finished; best action is None if there is no valid move
+    :rtype: ((int,int), int, int)
+    """
+    ordering = MoveOrdering()
+    table = table if table is not None else TranspositionTable()
+    deadline = time.time() + budget_ms / 1000.0
+    result = (None, None, 0)
+    undo_size = len(state.undo)
+    d = 1
+    try:
+        while max_depth is None or d <= max_depth:
+            ctx = SearchContext(d, state.player, mode, ordering, table, deadline,
+                                TraceSink(level=TRACE_OFF), endgame_empties if d > 1 or max_depth == 1 else 0,
+                                book=book,
+                                guess=result[1], aspiration=aspiration)
+            v = alpha_beta_search(ctx, state)
+            result = (best_action(ctx), v, d)
+            if not ctx.depth_limited:  # whole game tree searched, deeper is the same
+                break
+            d = d + 1
+    except SearchTimeout:
+        while len(state.undo) > undo_size:
+            state.unmake_move()
+    return result
+
+
+shared_alpha = None  # in root search workers, best root value found by any worker so far
+
+
+def init_root_worker(alpha):
+    global shared_alpha
+    shared_alpha = alpha
+
+
+def search_root_move(args):
+    """
+    Search one root move in a pool worker, from the root's point of view, with
+    the best root value any worker has found so far as alpha
+    :param args: (initial state, root move, cut_off, mode)
+    :return: (root move, value, nodes visited)
+    """
+    state, a, cut_off, mode = args
+    ctx = SearchContext(cut_off, state.player, mode, trace=TraceSink(level=TRACE_OFF), config=state.config)
+    ctx.depth = 1
+    alpha = shared_alpha.value
+    state.make_move(a)
+    # alpha - 1 makes a tie with the best value exact, values are integers
+    v = min_value(ctx, state, alpha - 1, Infinity, a)
+    with shared_alpha.get_lock():
+        if v > shared_alpha.value:
+            shared_alpha.value = v
+    return a, v, ctx.nodes
+
+
+def parallel_search(state, cut_off, processes=None, mode=TT_MODE):
+    """
+    Split the root moves across a process pool. Workers share the best root value
+    as alpha. A move whose value ties the best is searched exactly, so the
+    result is the move next_state picks after a serial search, lowest position
+    first on ties.
+    :param state: initial state
+    :param cut_off: depth limit
+    :param processes: pool size, number of CPUs if None
+    :param mode: search mode of the workers
+    :type state: State
+    :type cut_off: int
+    :type processes: int
+    :type mode: str
+
+    :return: (best action, value, nodes visited); best action is None if there is no valid move
+    :rtype: ((int,int), int, int)
+    """
+    acts = actions(state)
+    if len(acts) == 0 or cut_off < 1:
+        ctx = SearchContext(cut_off, state.player, mode, trace=TraceSink(level=TRACE_OFF))
+        v = alpha_beta_search(ctx, state)
+        return best_action(ctx), v, ctx.nodes
+    ordering = MoveOrdering(hash_move=False, killers=False, history=False)
+    acts = ordering.order(acts, 0, None, state.config.evaluation)
+    alpha = multiprocessing.Value('d', -Infinity)
+    pool = multiprocessing.Pool(processes, init_root_worker, (alpha,))
+    try:
+        results = pool.map(search_root_move, [(state, a, cut_off, mode) for a in acts], 1)
+    finally:
+        pool.terminate()
+    best, best_v, nodes = None, -Infinity, 1
+    for a, v, n in results:
+        nodes = nodes + n
+        if v > best_v or (v == best_v and a < best):
+            best, best_v = a, v
+    return best, best_v, nodes
+
+
+def utility(state, player):
     """
     Calculate the value of a terminal state
     :param state: terminal state
+    :param player: player the value is for, -1 or 1
     :return: value
 
     :type state: State
+    :type player: int
     :rtype: int
     """
-    board = state.board
-    result = 0
-    for i in range(b_size):
-        for j in range(b_size):
-            result = result + board[i][j] * evaluation[i][j]
-    return result if Start_player == 1 else -result
+    return state.score if player == 1 else -state.score
 
 
 def actions(state):
     """
-    Return all valid moves available to State.player on current state.board
+    Return all valid moves available to State.player on the current board
     :param state: current state
     :type state: State
 
     :return: all valid moves
     :rtype: List[(int,int)]
     """
-    result = []
-    for i in range(b_size):
-        for j in range(b_size):
-            if state.is_valid_pos(i, j):
-                result.append((i, j))
-    return result
+    return bits_to_moves(state.config, state.legal_moves())
 
 
 def take_action(state, a):
     """
-    Return new state after placing a piece at position 'a' on current state.board
+    Return new state after placing a piece at position 'a' on the current board
     :param state: current state
     :type state: State
     :param a: action
@@ -253,74 +1401,118 @@ def take_action(state, a):
     return state
 
 
-def keep_trace(a, depth, v, alpha, beta):
-    trace = []
-    if a == 'root':
-        trace.append('root')
-    elif a == 'pass':
-        trace.append('pass')
-    else:
-        i, j = a
-        column = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
-        trace.append('{0}{1}'.format(column[j], i + 1))
+def move_str(a):
+    """
+    :param a: action, 'root' or 'pass'
+    :return: action in trace notation, e.g. 'b6'
+    :rtype: str
+    """
+    if a == 'root' or a == 'pass':
+        return a
+    i, j = a
+    return '{0}{1}'.format(chr(ord('a') + j), i + 1)
+
+
+def keep_trace(ctx, a, depth, v, alpha, beta):
+    if depth == 1 and a != 'pass':
+        ctx.next_actions[a] = v
+    if depth > ctx.trace.level:
+        return
+    trace = [move_str(a)]
     trace.append(value_str(depth))
     trace.append(value_str(v))
     trace.append(value_str(alpha))
     trace.append(value_str(beta))
-    traces.append(','.join(trace))
-    if depth == 1 and a != 'pass':
-        next_actions[a] = v
+    ctx.trace.add(','.join(trace))
     return
 
 
-def next_state(state):
+def best_action(ctx):
+    """
+    :param ctx: finished search
+    :type ctx: SearchContext
+    :return: the valid action with the highest value after a search, lowest
+    position first on ties; None if there is no valid action
+    :rtype: (int,int)
+    """
     l = []  # to sort the next state
-    for key, value in next_actions.iteritems():
+    for key, value in ctx.next_actions.iteritems():
         l.append((value, key))
     l.sort(key=lambda x: x[1])  # rank by value in descending order
     l.sort(key=lambda x: x[0], reverse=True)  # rank by position in ascending order
     if len(l) == 0:
+        return None
+    return l[0][1]
+
+
+def next_state(ctx, state):
+    a = best_action(ctx)
+    if a is None:
         return state
-    i, j = l[0][1]
+    i, j = a
     state.update_board(i, j)
     return state
 
 
-def read_from_file(fname):
-    global cut_off, Start_player
+def read_from_file(fname, config=None):
+    """
+    :param config: board configuration, see parse_position
+    :return: (initial state, cut_off)
+    :rtype: (State, int)
+    """
     f = open(fname, 'r')
-    player = f.readline()[0]
-    if player == 'X':
-        Start_player = 1
-    elif player == 'O':
-        Start_player = -1
-    cut_off = int(f.readline())
-    board = f.readlines(8)
-    b = [[0 for col in range(b_size)] for row in range(b_size)]
-    for i in range(b_size):
-        for j in range(b_size):
+    lines = f.readlines()
+    f.close()
+    return parse_position(lines, config)
+
+
+def parse_position(lines, config=None):
+    """
+    :param lines: lines in the input file format
+    :param config: board configuration, board_config of the width of the
+    board rows if None; the size found is that of State.config
+    :type lines: List[str]
+    :type config: BoardConfig
+    :return: (initial state, cut_off)
+    :rtype: (State, int)
+    """
+    size = len(lines[2].strip())
+    if config is None:
+        config = board_config(size)
+    elif size != config.size:
+        raise ValueError('board is {0} x {0}, not {1} x {1}'.format(size, config.size))
+    player = lines[0][0]
+    start_player = 1
+    if player == 'O':
+        start_player = -1
+    cut_off = int(lines[1])
+    board = lines[2:]
+    b = [[0 for col in range(size)] for row in range(size)]
+    for i in range(size):
+        for j in range(size):
             if board[i][j] == '*':
                 b[i][j] = 0
             elif board[i][j] == 'O':
                 b[i][j] = -1
             elif board[i][j] == 'X':
                 b[i][j] = 1
-    f.close()
-    state = State(b, Start_player)
-    return state
+    state = State(b, start_player, config)
+    return state, cut_off
 
 
-def write_to_file(fname, state):
+def write_to_file(fname, state, trace):
     f = open(fname, 'w')
     dict = {0: '*', 1: 'X', -1: 'O'}
-    b = [[0 for col in range(b_size)] for row in range(b_size)]  # board to print
-    for i in range(b_size):
-        for j in range(b_size):
-            b[i][j] = dict[state.board[i][j]]
+    board = state.to_board()
+    size = state.config.size
+    b = [[0 for col in range(size)] for row in range(size)]  # board to print
+    for i in range(size):
+        for j in range(size):
+            b[i][j] = dict[board[i][j]]
     for i in b:  # print board
         f.write(''.join(i))
         f.write('\n')
-    f.write('\n'.join(traces))  # print traces
+    trace.write_to(f)  # print traces
     f.close()
 
 
@@ -0,0 +1,192 @@
+"""
+Opening book: best moves of every position up to a number of plies from the
+start, searched once with the engine and looked up in O(1) afterwards.
+
+Positions are stored under their canonical form among the 8 board symmetries,
+in an open addressing hash table on disk that is read through mmap:
+    header  magic, number of slots, plies, search depth, board size  ('<4sIIII')
+    slots   X bitboard, O bitboard, player to move (0 for an empty slot),
+            bitboard of the best moves, value  ('<QQbQh')
+Moves and values are for the player to move. All moves tied for the best
+are stored, so that lookup can pick the lowest position in the orientation
+of the position looked up, like a search of it would. Books are for boards of at
+most 64 squares, with the board configuration they are built with; opening
+a book for another size raises ValueError.
+
+    python opening_book.py book.bin --plies 6 --depth 4
+"""
+import argparse
+import mmap
+import multiprocessing
+import struct
+
+from hw1cs561s2017 import TT_MODE, TRACE_OFF, SearchContext, State, TraceSink, \
+    actions, alpha_beta_search, bits_to_board, bits_to_moves, board_config, canonical_bits, to_original, \
+    zobrist_bits
+
+MAGIC = b'RVB2'
+HEADER = struct.Struct('<4sIIII')
+SLOT = struct.Struct('<QQbQh')
+
+
+def start_state(config=None):
+    """
+    :param config: board configuration, board_config() if None
+    :type config: hw1cs561s2017.BoardConfig
+    """
+    if config is None:
+        config = board_config()
+    size = config.size
+    b = [[0 for col in range(size)] for row in range(size)]
+    half = size // 2
+    b[half - 1][half - 1] = b[half][half] = -1
+    b[half - 1][half] = b[half][half - 1] = 1
+    return State(b, 1, config)
+
+
+def canonical_position(state):
+    """
+    :return: (X bitboard, O bitboard, player to move) of the canonical form of state
+    :rtype: (int, int, int)
+    """
+    x, o, t = canonical_bits(state.config, state.x_bits, state.o_bits)
+    return x, o, state.player
+
+
+def state_of(position, config):
+    x, o, player = position
+    return State(bits_to_board(config, x, o), player, config)
+
+
+def book_positions(plies, config):
+    """
+    :return: canonical positions within 'plies' moves of the start where the
+    player to move has a valid move
+    :rtype: List[(int, int, int)]
+    """
+    frontier = [canonical_position(start_state(config))]
+    seen = set(frontier)
+    for ply in range(plies):
+        next_frontier = []
+        for position in frontier:
+            state = state_of(position, config)
+            for a in actions(state):
+                state.make_move(a)
+                child = canonical_position(state)
+                state.unmake_move()
+                if child not in seen:
+                    seen.add(child)
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return sorted(p for p in seen if len(actions(state_of(p, config))) > 0)
+
+
+def search_position(args):
+    """
+    :param args: (canonical position, cut_off, board configuration)
+    :return: (position, bitboard of the moves tied for the best, value)
+    """
+    position, depth, config = args
+    state = state_of(position, config)
+    ctx = SearchContext(depth, state.player, TT_MODE, trace=TraceSink(level=TRACE_OFF), exact_ties=True)
+    v = alpha_beta_search(ctx, state)
+    best = 0
+    for (i, j), child_v in ctx.next_actions.items():
+        if child_v == v:
+            best |= 1 << (i * config.size + j)
+    return position, best, v
+
+
+def build_opening_book(fname, plies, depth, processes=None, config=None):
+    """
+    Search every position up to 'plies' moves from the start with cut_off
+    'depth' over a process pool and write the book to fname
+    :param config: board configuration, board_config() if None
+    :type config: hw1cs561s2017.BoardConfig
+    :return: number of positions in the book
+    :rtype: int
+    """
+    if config is None:
+        config = board_config()
+    if config.size ** 2 > 64:
+        raise ValueError('opening books are for boards of at most 64 squares')
+    positions = book_positions(plies, config)
+    pool = multiprocessing.Pool(processes)
+    try:
+        entries = pool.map(search_position, [(p, depth, config) for p in positions])
+    finally:
+        pool.terminate()
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    data = bytearray(HEADER.size + slots * SLOT.size)
+    HEADER.pack_into(data, 0, MAGIC, slots, plies, depth, config.size)
+    for (x, o, player), best, v in entries:
+        i = zobrist_bits(config, x, o, player) & (slots - 1)
+        while SLOT.unpack_from(data, HEADER.size + i * SLOT.size)[2] != 0:
+            i = (i + 1) & (slots - 1)
+        SLOT.pack_into(data, HEADER.size + i * SLOT.size, x, o, player, best, v)
+    f = open(fname, 'wb')
+    f.write(data)
+    f.close()
+    return len(entries)
+
+
+class OpeningBook(object):
+    def __init__(self, fname, size=8):
+        """
+        :param fname: book written by build_opening_book
+        :param size: board size the book has to be for
+        """
+        self.f = open(fname, 'rb')
+        self.data = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots, self.plies, self.depth, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('not an opening book: {0}'.format(fname))
+        if self.size != size:
+            self.close()
+            raise ValueError('opening book is for {0} x {0} boards: {1}'.format(self.size, fname))
+
+    def lookup(self, state):
+        """
+        :type state: State
+        :return: (best action, value) for State.player, None if state is not in the book
+        :rtype: ((int,int), int)
+        """
+        config = state.config
+        if config.size != self.size:
+            raise ValueError('opening book is for {0} x {0} boards, not {1} x {1}'.format(self.size, config.size))
+        x, o, t = canonical_bits(config, state.x_bits, state.o_bits)
+        i = zobrist_bits(config, x, o, state.player) & (self.slots - 1)
+        while True:
+            sx, so, player, best, v = SLOT.unpack_from(self.data, HEADER.size + i * SLOT.size)
+            if player == 0:
+                return None
+            if sx == x and so == o and player == state.player:
+                return min(to_original(self.size, a, t) for a in bits_to_moves(config, best)), v
+            i = (i + 1) & (self.slots - 1)
+
+    def close(self):
+        self.data.close()
+        self.f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build an opening book.')
+    parser.add_argument('output', help='book file to write')
+    parser.add_argument('--plies', type=int, default=6, help='moves from the start to cover')
+    parser.add_argument('--depth', type=int, default=4, help='search cut_off of every position')
+    parser.add_argument('--size', type=int, default=8, help='board size, with generated weights if not 8')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+    try:
+        config = board_config(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+    n = build_opening_book(args.output, args.plies, args.depth, args.processes, config)
+    print('{0} positions written to {1}'.format(n, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Vectorized evaluation of many boards at once with NumPy.
+
+evaluate_batch scores a stack of boards, shape (K, size, size), for
+positional weight, mobility and frontier discs in one call. BatchEvaluator
+plugs it into the search as SearchContext.leaf_evaluator, so that all leaves
+below a node on the last ply are scored together.
+
+The board size and evaluation table are those of the BoardConfig of the
+boards scored, so one evaluator serves boards of any size.
+"""
+import numpy as np
+
+from hw1cs561s2017 import DIRECTIONS, board_config, flips_bits
+
+weights_arrays = {}  # BoardConfig -> int32 array of its evaluation table
+
+
+def weights_array(config):
+    """
+    :type config: hw1cs561s2017.BoardConfig
+    :return: int32 array of config.evaluation, made once per configuration
+    """
+    weights = weights_arrays.get(config)
+    if weights is None:
+        weights = np.array(config.evaluation, dtype=np.int32)
+        weights_arrays[config] = weights
+    return weights
+
+
+def shift(a, di, dj):
+    """
+    :param a: array (K, size, size)
+    :return: array with out[:, i + di, j + dj] = a[:, i, j], zero where nothing moved in
+    """
+    size = a.shape[1]
+    out = np.zeros_like(a)
+    out[:, max(di, 0):size + min(di, 0), max(dj, 0):size + min(dj, 0)] = \
+        a[:, max(-di, 0):size + min(-di, 0), max(-dj, 0):size + min(-dj, 0)]
+    return out
+
+
+def valid_moves(own, opp):
+    """
+    :param own: bool array (K, size, size), pieces of the player to move
+    :param opp: bool array (K, size, size), pieces of the opponent
+    :return: bool array (K, size, size), squares the player can move to
+    """
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for di, dj in DIRECTIONS:
+        x = shift(own, di, dj) & opp
+        for step in range(own.shape[1] - 3):
+            x |= shift(x, di, dj) & opp
+        moves |= shift(x, di, dj) & empty
+    return moves
+
+
+def frontier(own, empty):
+    """
+    :return: bool array (K, size, size), pieces next to an empty square
+    """
+    near_empty = np.zeros_like(empty)
+    for di, dj in DIRECTIONS:
+        near_empty |= shift(empty, di, dj)
+    return own & near_empty
+
+
+def evaluate_batch(boards, config=None):
+    """
+    :param boards: int8 array (K, size, size), 1 for X, -1 for O and 0 for empty
+    :param config: board configuration of the boards, board_config(size) if None
+    :type config: hw1cs561s2017.BoardConfig
+    :return: (positional, mobility, frontier) int arrays of shape (K,), all for X:
+    evaluation table weights, valid moves and frontier discs of X minus those of O
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    if config is None:
+        config = board_config(boards.shape[1])
+    x, o = boards == 1, boards == -1
+    empty = boards == 0
+    positional = (boards.astype(np.int32) * weights_array(config)).sum(axis=(1, 2))
+    mobility = valid_moves(x, o).sum(axis=(1, 2)) - valid_moves(o, x).sum(axis=(1, 2))
+    front = frontier(x, empty).sum(axis=(1, 2)) - frontier(o, empty).sum(axis=(1, 2))
+    return positional, mobility.astype(np.int32), front.astype(np.int32)
+
+
+def bits_to_array(size, bits_list):
+    """
+    :param size: board size
+    :param bits_list: K bitboards
+    :return: bool array (K, size, size)
+    """
+    n = size * size
+    words = (n + 63) // 64
+    word_mask = (1 << 64) - 1
+    w = np.array([[(b >> (64 * k)) & word_mask for k in range(words)] for b in bits_list], dtype=np.uint64)
+    bits = (w[:, :, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    return bits.reshape(len(bits_list), words * 64)[:, :n].reshape(-1, size, size).astype(bool)
+
+
+def child_boards(state, acts):
+    """
+    :param state: current state
+    :param acts: actions of State.player, may be ['pass']
+    :return: int8 array (K, size, size) of the boards after each action
+    """
+    config = state.config
+    own, opp = state.pieces()
+    own_list, opp_list = [], []
+    for a in acts:
+        if a == 'pass':
+            own_list.append(own)
+            opp_list.append(opp)
+            continue
+        m = 1 << (a[0] * config.size + a[1])
+        f = flips_bits(config, own, opp, m)
+        own_list.append(own | m | f)
+        opp_list.append(opp ^ f)
+    own_arr, opp_arr = bits_to_array(config.size, own_list), bits_to_array(config.size, opp_list)
+    boards = own_arr.astype(np.int8) - opp_arr.astype(np.int8)
+    return boards if state.player == 1 else -boards
+
+
+class BatchEvaluator(object):
+    def __init__(self, positional=1, mobility=0, frontier=0):
+        """
+        Linear evaluation of positional score, mobility and frontier discs.
+        With the default weights the values are the same as utility().
+        :param positional: weight of the evaluation table score
+        :param mobility: weight of valid moves difference
+        :param frontier: weight of frontier discs difference, usually negative
+        """
+        self.weights = (positional, mobility, frontier)
+
+    def __call__(self, state, acts, player):
+        """
+        :param state: node on the last ply, or a game over leaf with acts ['pass']
+        :param acts: actions of State.player
+        :param player: player the values are for, -1 or 1
+        :return: value of the leaf after each action, rounded to int
+        :rtype: List[int]
+        """
+        positional, mobility, front = evaluate_batch(child_boards(state, acts), state.config)
+        wp, wm, wf = self.weights
+        values = (wp * positional + wm * mobility + wf * front) * player
+        return [int(round(v)) for v in values]
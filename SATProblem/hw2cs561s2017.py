@@ -1,62 +1,66 @@
+import multiprocessing
 import random
-
-class Literal:
-    def __init__(self, positive, guest, table):
-        self.positive = positive
-        self.guest = guest
-        self.table = table
-
-    def is_complementary(self, other):
-        """
-        :type other: Literal
-        :param other: the other literal
-        :return:
-        """
-        if self.positive != other.positive and self.guest == other.guest \
-                and self.table == other.table:
-            return True
-        return False
-
-    def complementary_literal(self):
-        return Literal(not self.positive, self.guest, self.table)
-
-    def __eq__(self, other):
-        """Override the default Equals behavior"""
-        if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
-        return NotImplemented
-
-    def __ne__(self, other):
-        """Define a non-equality test"""
-        if isinstance(other, self.__class__):
-            return not self.__eq__(other)
-        return NotImplemented
-
-    def __hash__(self):
-        """Override the default hash behavior (that returns the id or the object)"""
-        return hash(tuple(sorted(self.__dict__.items())))
-
+import sys
+import time
 
 class Model:
-    def __init__(self, M, N, clauseSet=set()):
+    def __init__(self, M, N, clauseSet=None):
         """
+        Literals are DIMACS style signed ints: X(guest, table) is variable
+        (guest - 1) * N + table, a literal is the variable or its negation,
+        and a clause is a tuple of literals.
         :param M: n_guest
         :param N: n_table
-        :param clauseSet: CNF
+        :param clauseSet: CNF, a new empty set if None
         """
         self.M = M
         self.N = N
-        self.clauseSet = clauseSet
+        self.clauseSet = clauseSet if clauseSet is not None else set()
         # M row * N col 2-D array
         self.symbols = [[bool(random.getrandbits(1)) for i in range(N)] for j in range(M)]
 
+    def variable(self, guest, table):
+        """
+        :return: variable of X(guest, table), 1 to M * N
+        :rtype: int
+        """
+        return (guest - 1) * self.N + table
+
+    def literal(self, positive, guest, table):
+        """
+        :return: X(guest, table) if positive, else not X(guest, table)
+        :rtype: int
+        """
+        variable = self.variable(guest, table)
+        if positive:
+            return variable
+        return -variable
+
+    def guest_table(self, literal):
+        """
+        :return: (guest, table) of the variable of literal
+        :rtype: (int, int)
+        """
+        guest, table = divmod(abs(literal) - 1, self.N)
+        return guest + 1, table + 1
+
+    def set_symbols(self, assignment):
+        """
+        :param assignment: variable -> bool, variables left out are false
+        :type assignment: dict
+        """
+        for guest in range(1, self.M + 1):
+            for table in range(1, self.N + 1):
+                self.symbols[guest - 1][table - 1] = assignment.get(self.variable(guest, table), False)
+
     def clause_value(self, clause):
         clause_value = False
         for literal in clause:
-            if literal.positive:
-                literal_value = self.symbols[literal.guest - 1][literal.table - 1]
+            guest, table = self.guest_table(literal)
+            if literal > 0:
+                literal_value = self.symbols[guest - 1][table - 1]
             else:
-                literal_value = not (self.symbols[literal.guest - 1][literal.table - 1])
+                literal_value = not (self.symbols[guest - 1][table - 1])
             clause_value = clause_value or literal_value
         return clause_value
 
@@ -68,7 +72,7 @@ class Model:
             clause = []
             # Union X(a, i) for i = 1, 2, .., n_table
             for i in range(1, N + 1):
-                literal = Literal(True, a, i)
+                literal = self.literal(True, a, i)
                 clause.append(literal)
             self.clauseSet.add(tuple(clause))
             # Union {not X(a, i) U not X(a,j)} for 1 <= i < j <= n_table
@@ -76,9 +80,9 @@ class Model:
                 for j in range(i + 1, N + 1):
                     clause = []
                     # not X(a, i) U not X(a,j)
-                    literal = Literal(False, a, i)
+                    literal = self.literal(False, a, i)
                     clause.append(literal)
-                    literal = Literal(False, a, j)
+                    literal = self.literal(False, a, j)
                     clause.append(literal)
                     self.clauseSet.add(tuple(clause))
         return
@@ -93,16 +97,16 @@ class Model:
         for i in range(1, N + 1):
             clause = []
             # not X(a, i) Union X(b, i)
-            literal = Literal(False, a, i)
+            literal = self.literal(False, a, i)
             clause.append(literal)
-            literal = Literal(True, b, i)
+            literal = self.literal(True, b, i)
             clause.append(literal)
             self.clauseSet.add(tuple(clause))
             # X(a, i) Union not X(b, i)
             clause = []
-            literal = Literal(True, a, i)
+            literal = self.literal(True, a, i)
             clause.append(literal)
-            literal = Literal(False, b, i)
+            literal = self.literal(False, b, i)
             clause.append(literal)
             self.clauseSet.add(tuple(clause))
         return
@@ -117,9 +121,9 @@ class Model:
         for i in range(1, N + 1):
             clause = []
             # not X(a, i) U not X(b,j)
-            literal = Literal(False, a, i)
+            literal = self.literal(False, a, i)
             clause.append(literal)
-            literal = Literal(False, b, i)
+            literal = self.literal(False, b, i)
             clause.append(literal)
             self.clauseSet.add(tuple(clause))
         return
@@ -131,9 +135,9 @@ class PLResolution:
 
     def pl_resolve(self, c1, c2):
         """
-        :type c1: tuple(Literal)
-        :type c2: tuple(Literal)
-        :rtype: set(tuple(Literal))
+        :type c1: tuple(int)
+        :type c2: tuple(int)
+        :rtype: set(tuple(int))
 
         :param c1: clause1
         :param c2: clause2
@@ -142,19 +146,19 @@ class PLResolution:
         resolventSet = set()
         for literal in c1:
             resolvent = []
-            if literal.complementary_literal() in c2:
+            if -literal in c2:
                 for i in c1:
                     if i != literal:
                         resolvent.append(i)
                 for j in c2:
-                    if j != literal.complementary_literal():
+                    if j != -literal:
                         resolvent.append(j)
                 resolventSet.add(tuple(resolvent))
         return resolventSet
 
     def pl_resolution(self, clauseSet):
         """
-        :type clauseSet: set(tuple(literal))
+        :type clauseSet: set(tuple(int))
         :rtype: bool
 
         :param clauseSet:
@@ -181,95 +185,162 @@ class PLResolution:
 
 class WalkSAT:
     def __init__(self, model):
+        """
+        Local search from model.symbols. Each flip only visits the clauses
+        of the flipped variable: per clause it keeps the number of true
+        literals and the sum of their variables (the variable of the only
+        true literal when there is one), per variable its make score
+        (unsatisfied clauses it would satisfy) and break score (clauses it
+        alone satisfies), and the unsatisfied clauses in an indexed list.
+        :type model: Model
+        """
         self.model = model
+        self.flips = 0
 
     def walksat(self, p, max_flip):
+        """
+        :param p: probability of flipping a random variable of the chosen clause
+        :param max_flip: flips to try
+        :return: model.symbols once all clauses are satisfied, None if they
+        are not after max_flip flips; model.symbols holds the last assignment either way
+        """
+        self.setup()
         for i in range(max_flip):
-            if self.is_satisfied():
-                return self.model.symbols
-            negClause = self.random_select_neg_clause()
+            if len(self.unsat) == 0:
+                break
+            clause = self.clauses[random.choice(self.unsat)]
             if random.random() < p:
-                self.flip_symbol_random(negClause)
+                variable = abs(random.choice(clause))
             else:
-                self.flip_symbol_max(negClause)
+                variable = self.best_variable(clause)
+            self.flip(variable)
+        self.model.set_symbols(self.value_map())
+        if len(self.unsat) == 0:
+            return self.model.symbols
         return None
 
-    def deepcopy_2D_list(self, l):
-        return [x[:] for x in l]
+    def value_map(self):
+        """
+        :return: current assignment, variable -> bool
+        :rtype: dict
+        """
+        return dict((v, self.value[v]) for v in range(1, len(self.value)))
 
-    def is_satisfied(self):
+    def setup(self):
         model = self.model
-        if len(model.clauseSet) == self.count_satisfied_clauses():
-            return True
-        else:
-            return False
-
-    def flip_symbol_random(self, clause):
-        literalList = list(clause)
-        # Return a random integer N such that a <= N <= b. r = random.randint
-        r = random.randint(0, len(literalList) - 1)
-        x = literalList[r].guest - 1
-        y = literalList[r].table - 1
-        self.flip_symbol(x, y)
-        return
-
-    def flip_symbol_max(self, clause):
+        n = model.M * model.N
+        self.value = [False] * (n + 1)
+        for guest in range(1, model.M + 1):
+            for table in range(1, model.N + 1):
+                self.value[model.variable(guest, table)] = model.symbols[guest - 1][table - 1]
+        self.clauses = []
+        self.occurrences = {}  # literal -> indices of the clauses it is in
+        for clause in model.clauseSet:
+            clause = tuple(set(clause))
+            if any(-literal in clause for literal in clause):
+                continue  # always true
+            for literal in clause:
+                self.occurrences.setdefault(literal, []).append(len(self.clauses))
+            self.clauses.append(clause)
+        self.true_count = [0] * len(self.clauses)
+        self.true_sum = [0] * len(self.clauses)
+        self.make = [0] * (n + 1)
+        self.breaks = [0] * (n + 1)
+        self.unsat = []
+        self.unsat_index = [-1] * len(self.clauses)  # position in self.unsat, -1 if satisfied
+        for c, clause in enumerate(self.clauses):
+            for literal in clause:
+                if self.value[abs(literal)] == (literal > 0):
+                    self.true_count[c] += 1
+                    self.true_sum[c] += abs(literal)
+            if self.true_count[c] == 0:
+                self.add_unsat(c)
+                for literal in clause:
+                    self.make[abs(literal)] += 1
+            elif self.true_count[c] == 1:
+                self.breaks[self.true_sum[c]] += 1
+
+    def add_unsat(self, c):
+        self.unsat_index[c] = len(self.unsat)
+        self.unsat.append(c)
+
+    def remove_unsat(self, c):
+        i = self.unsat_index[c]
+        last = self.unsat.pop()
+        if last != c:
+            self.unsat[i] = last
+            self.unsat_index[last] = i
+        self.unsat_index[c] = -1
+
+    def best_variable(self, clause):
         """
-        flip symbol in clause to maximizes number of satisfied clauses
-        :param clause:
-        :type clause: tuple(Literal)
-        :return:
+        :return: variable of the clause whose flip leaves the most clauses
+        satisfied, the first one on ties
         """
-        model = self.model
-        literalList = list(clause)
-        m_x, m_y = -1, -1  # symbol in clause maximizes number satisfied clauses
-        max_count = -1
-        for i in range(len(literalList)):
-            symbols_copy = self.deepcopy_2D_list(model.symbols)
-            x = literalList[i].guest - 1
-            y = literalList[i].table - 1
-            self.flip_symbol(x, y)
-            if self.count_satisfied_clauses() > max_count:
-                max_count = self.count_satisfied_clauses()
-                m_x, m_y = x, y
-            model.symbols = self.deepcopy_2D_list(symbols_copy)
-        self.flip_symbol(m_x, m_y)
-        return
-
-    def flip_symbol(self, x, y):
-        flip = self.model.symbols[x][y]
-        self.model.symbols[x][y] = not flip
-        return
-
-    def random_select_neg_clause(self):
-        negClauseList = []
-        for clause in self.model.clauseSet:
-            clause_value = self.model.clause_value(clause)
-            if not clause_value:
-                negClauseList.append(clause)
-        # Return a random integer N such that a <= N <= b. r = random.randint
-        r = random.randint(0, len(negClauseList) - 1)
-        return negClauseList[r]
-
-    def count_satisfied_clauses(self):
-        # clauses = []
-        count = 0
-        for clause in self.model.clauseSet:
-            clause_value = self.model.clause_value(clause)
-            if clause_value:
-                count = count + 1
-                # clauses.append(clause_value)
-        return count
+        best, best_score = 0, None
+        for literal in clause:
+            variable = abs(literal)
+            score = self.make[variable] - self.breaks[variable]
+            if best_score is None or score > best_score:
+                best, best_score = variable, score
+        return best
+
+    def flip(self, variable):
+        self.flips += 1
+        self.value[variable] = not self.value[variable]
+        made_true = variable if self.value[variable] else -variable
+        for c in self.occurrences.get(made_true, []):
+            count = self.true_count[c]
+            if count == 0:
+                self.remove_unsat(c)
+                for literal in self.clauses[c]:
+                    self.make[abs(literal)] -= 1
+                self.breaks[variable] += 1
+            elif count == 1:
+                self.breaks[self.true_sum[c]] -= 1
+            self.true_count[c] = count + 1
+            self.true_sum[c] += variable
+        for c in self.occurrences.get(-made_true, []):
+            count = self.true_count[c] - 1
+            self.true_count[c] = count
+            self.true_sum[c] -= variable
+            if count == 0:
+                self.add_unsat(c)
+                for literal in self.clauses[c]:
+                    self.make[abs(literal)] += 1
+                self.breaks[variable] -= 1
+            elif count == 1:
+                self.breaks[self.true_sum[c]] += 1
 
 
 class DPLL:
     def __init__(self):
-        pass
+        self.model = None  # variable -> bool after a satisfiable formula
 
-    def dpll(self, clauseSet):
+    def solve(self, clauseSet):
+        """
+        :type clauseSet: set(tuple(int))
+        :return: a satisfying assignment, variable -> bool, None if
+        unsatisfiable; variables left out can take either value
+        :rtype: dict
+        """
+        self.model = None
+        if self.dpll(clauseSet):
+            return self.model
+        return None
+
+    def dpll(self, clauseSet, model=None):
+        """
+        :param model: values given on the way to clauseSet, variable -> bool
+        :return: true if the clauseSet is satisfiable, the model is then in self.model
+        :rtype: bool
+        """
         # print_clause_set(clauseSet)
+        if model is None:
+            model = {}
         # every clause True
         if len(clauseSet) == 0:
+            self.model = model
             return True
         # some clause False
         for c in clauseSet:
@@ -278,34 +349,37 @@ class DPLL:
         # pure symbol
         pure = self.find_pure_symbol(clauseSet)
         if len(pure) > 0:
+            for literal in pure:
+                model[abs(literal)] = literal > 0
             clauseSet = self.pure_symbol_rule(clauseSet, pure)
-            return self.dpll(clauseSet)
+            return self.dpll(clauseSet, model)
         # unit symbol
         unit = self.find_first_unit_symbol(clauseSet)
         if len(unit) > 0:
+            for literal in unit:
+                model[abs(literal)] = literal > 0
             clauseSet = self.unit_symbol_rules(clauseSet, unit)
-            return self.dpll(clauseSet)
-        # try values for first symbol
+            return self.dpll(clauseSet, model)
+        # try values for first symbol, each branch with its own copy of the model
         first_literal = self.first_literal(clauseSet)
-        clauseSet1 = self.assign_true_value(clauseSet, first_literal)
-        clauseSet2 = self.assign_false_value(clauseSet, first_literal)
-        return self.dpll(clauseSet1) or self.dpll(clauseSet2)
+        model_true = dict(model)
+        model_true[abs(first_literal)] = first_literal > 0
+        if self.dpll(self.assign_true_value(clauseSet, first_literal), model_true):
+            return True
+        model[abs(first_literal)] = first_literal < 0
+        return self.dpll(self.assign_false_value(clauseSet, first_literal), model)
 
     def find_pure_symbol(self, clauseSet):
         neg_literal = set()
         pos_literal = set()
         for clause in clauseSet:
             for literal in clause:
-                if literal.positive:
+                if literal > 0:
                     pos_literal.add(literal)
                 else:
                     neg_literal.add(literal)
-        pos_literal_trans = set()
-        neg_literal_trans = set()
-        for literal in pos_literal:
-            pos_literal_trans.add(literal.complementary_literal())
-        for literal in neg_literal:
-            neg_literal_trans.add(literal.complementary_literal())
+        pos_literal_trans = set([-literal for literal in pos_literal])
+        neg_literal_trans = set([-literal for literal in neg_literal])
         pos_literal = pos_literal.difference(pos_literal.intersection(neg_literal_trans))
         neg_literal = neg_literal.difference(neg_literal.intersection(pos_literal_trans))
         return pos_literal.union(neg_literal)
@@ -341,7 +415,7 @@ class DPLL:
         for clause in clauseSet:
             literal_list = []
             for literal in clause:
-                if literal.complementary_literal() not in unit:
+                if -literal not in unit:
                     literal_list.append(literal)
             clause_return.add(tuple(literal_list))
         return clause_return
@@ -357,7 +431,336 @@ class DPLL:
         return self.unit_symbol_rules(clauseSet, set([first_literal]))
 
     def assign_false_value(self, clauseSet, first_literal):
-        return self.assign_true_value(clauseSet, first_literal.complementary_literal())
+        return self.assign_true_value(clauseSet, -first_literal)
+
+
+class CDCL:
+    def __init__(self, restart_base=100, decay=0.95):
+        """
+        Conflict driven clause learning: two watched literals per clause, an
+        assignment trail, first-UIP clause learning, non-chronological
+        backjumping, VSIDS-style variable activity with phase saving, and
+        restarts after restart_base times the Luby sequence of conflicts.
+        No recursion, so the formula size is not limited by the stack.
+        :param restart_base: conflicts per unit of the Luby sequence
+        :param decay: activity decay per conflict
+        """
+        self.restart_base = restart_base
+        self.decay = decay
+        self.model = None  # variable -> bool after a satisfiable formula
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.restarts = 0
+
+    def dpll(self, clauseSet):
+        """
+        Drop-in for DPLL().dpll
+        :type clauseSet: set(tuple(int))
+        :return: true if the clauseSet is satisfiable, the model is then in self.model
+        :rtype: bool
+        """
+        return self.solve(clauseSet) is not None
+
+    def solve(self, clauseSet):
+        """
+        :type clauseSet: set(tuple(int))
+        :return: a satisfying assignment, variable -> bool, None if unsatisfiable
+        :rtype: dict
+        """
+        self.model = None
+        n = 0
+        for clause in clauseSet:
+            for literal in clause:
+                n = max(n, abs(literal))
+        self.value = [0] * (n + 1)  # 1 true, -1 false, 0 unassigned
+        self.level = [0] * (n + 1)
+        self.reason = [None] * (n + 1)  # clause that implied the variable
+        self.activity = [0.0] * (n + 1)
+        self.phase = [-1] * (n + 1)  # value the variable had last, tried first
+        self.increment = 1.0
+        self.watches = {}  # literal -> clauses watching it
+        self.trail = []  # assigned literals in order
+        self.trail_lim = []  # trail length at each decision
+        self.qhead = 0  # trail[qhead:] are not propagated yet
+        for clause in clauseSet:
+            clause = list(set(clause))
+            if any(-literal in clause for literal in clause):
+                continue  # always true
+            if len(clause) == 0:
+                return None
+            if len(clause) == 1:
+                if not self.enqueue(clause[0], None):
+                    return None
+                continue
+            self.watch(clause)
+        if self.propagate() is not None:
+            return None
+        luby_index = 1
+        budget = self.restart_base * self.luby(luby_index)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if len(self.trail_lim) == 0:
+                    return None
+                learnt, back_level = self.analyze(conflict)
+                self.backjump(back_level)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.increment /= self.decay
+                continue
+            if budget <= 0:
+                self.restarts += 1
+                luby_index += 1
+                budget = self.restart_base * self.luby(luby_index)
+                self.backjump(0)
+                continue
+            variable = self.pick_branch_variable()
+            if variable == 0:
+                self.model = dict((v, self.value[v] > 0) for v in range(1, n + 1))
+                return self.model
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(variable * self.phase[variable], None)
+
+    def luby(self, i):
+        """
+        :return: i-th element of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+        """
+        size, seq = 1, 0
+        while size < i + 1:
+            seq += 1
+            size = 2 * size + 1
+        while size - 1 != i:
+            size = (size - 1) // 2
+            seq -= 1
+            i = i % size
+        return 2 ** seq
+
+    def watch(self, clause):
+        """Watch the first two literals of a clause of at least two literals"""
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def literal_value(self, literal):
+        """
+        :return: 1 if literal is true, -1 if false, 0 if unassigned
+        """
+        if literal > 0:
+            return self.value[literal]
+        return -self.value[-literal]
+
+    def enqueue(self, literal, reason):
+        """
+        Make literal true
+        :return: false if literal is already false
+        """
+        v = self.literal_value(literal)
+        if v != 0:
+            return v > 0
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.trail_lim)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+        return True
+
+    def propagate(self):
+        """
+        Unit propagation over the watched literals of the newly false literals
+        :return: a clause with all literals false, None if there is none
+        """
+        value = self.value
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            watchers = self.watches.get(false_literal, [])
+            kept = []
+            i = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if (value[first] if first > 0 else -value[-first]) > 0:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if (value[literal] if literal > 0 else -value[-literal]) >= 0:
+                        clause[1], clause[k] = literal, false_literal
+                        self.watches.setdefault(literal, []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if not self.enqueue(first, clause):
+                        kept.extend(watchers[i:])
+                        self.watches[false_literal] = kept
+                        self.qhead = len(self.trail)
+                        return clause
+            self.watches[false_literal] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        First-UIP conflict analysis
+        :return: (learnt clause with the asserting literal first and a literal
+        of the backjump level second, backjump level)
+        """
+        seen = set()
+        learnt = [None]
+        current = len(self.trail_lim)
+        counter = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in clause:
+                if q == literal:
+                    continue
+                variable = abs(q)
+                if variable not in seen and self.level[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.level[variable] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reason[abs(literal)]
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = -literal
+        back_level = 0
+        if len(learnt) > 1:
+            k = max(range(1, len(learnt)), key=lambda j: self.level[abs(learnt[j])])
+            learnt[1], learnt[k] = learnt[k], learnt[1]
+            back_level = self.level[abs(learnt[1])]
+        return learnt, back_level
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+
+    def backjump(self, level):
+        """Undo all assignments above decision level 'level'"""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = self.value[variable]
+            self.value[variable] = 0
+            self.reason[variable] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch_variable(self):
+        """
+        :return: unassigned variable of highest activity, 0 if all are assigned
+        """
+        best, best_activity = 0, -1.0
+        for variable in range(1, len(self.value)):
+            if self.value[variable] == 0 and self.activity[variable] > best_activity:
+                best, best_activity = variable, self.activity[variable]
+        return best
+
+
+def portfolio_worker(job):
+    """
+    Run one solver of a portfolio. A solver that fails, e.g. DPLL reaching
+    the recursion limit, gives no answer and the result 'error'.
+    :param job: (name, solver 'cdcl', 'dpll' or 'walksat', random seed, model, p, max_flip)
+    :return: (name, model or None, whether the answer is final, statistics)
+    :rtype: (str, dict, bool, dict)
+    """
+    name, solver, seed, model, p, max_flip = job
+    random.seed(seed)
+    start = time.time()
+    stats = {'worker': name}
+    try:
+        assignment, decided = run_solver(solver, model, p, max_flip, stats)
+    except Exception as e:
+        stats['result'] = 'error'
+        stats['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        stats['seconds'] = time.time() - start
+        return name, None, False, stats
+    stats['result'] = 'unknown' if not decided else 'sat' if assignment is not None else 'unsat'
+    stats['seconds'] = time.time() - start
+    return name, assignment, decided, stats
+
+
+def run_solver(solver, model, p, max_flip, stats):
+    """
+    :param stats: statistics of the solver are added to it
+    :return: (model or None, whether the answer is final)
+    :rtype: (dict, bool)
+    """
+    if solver == 'walksat':
+        model.symbols = [[bool(random.getrandbits(1)) for i in range(model.N)] for j in range(model.M)]
+        walk = WalkSAT(model)
+        assignment = None
+        if walk.walksat(p, max_flip) is not None:
+            assignment = walk.value_map()
+        decided = assignment is not None  # local search cannot prove unsatisfiability
+        stats['flips'] = walk.flips
+    elif solver == 'cdcl':
+        cdcl = CDCL()
+        assignment = cdcl.solve(model.clauseSet)
+        decided = True
+        for key in ('conflicts', 'decisions', 'propagations', 'restarts'):
+            stats[key] = getattr(cdcl, key)
+    else:
+        assignment = DPLL().solve(model.clauseSet)
+        decided = True
+    return assignment, decided
+
+
+def portfolio_solve(model, walkers=2, p=0.5, max_flip=100000, complete=('cdcl', 'dpll'), processes=None):
+    """
+    Race complete solvers and independently seeded WalkSAT workers over a
+    process pool. The first model found or proof of unsatisfiability wins
+    and the other workers are terminated.
+    :param model: encoded problem
+    :param walkers: number of WalkSAT workers, seeded 1, 2, ...
+    :param p: WalkSAT random walk probability
+    :param max_flip: flips per WalkSAT worker
+    :param complete: complete solvers to run, 'cdcl' and/or 'dpll'
+    :param processes: pool size, one process per worker if None
+    :type model: Model
+    :return: (model, variable -> bool, or None if unsatisfiable or no worker
+    decided; per-worker statistics, 'result' is 'sat', 'unsat', 'unknown',
+    'error' or 'cancelled')
+    :rtype: (dict, list(dict))
+    """
+    jobs = [(solver, solver, 0, model, p, max_flip) for solver in complete]
+    jobs += [('walksat-{0}'.format(k), 'walksat', k, model, p, max_flip) for k in range(1, walkers + 1)]
+    stats = dict((job[0], {'worker': job[0], 'result': 'cancelled'}) for job in jobs)
+    assignment = None
+    pool = multiprocessing.Pool(processes or len(jobs))
+    try:
+        for name, result, decided, worker_stats in pool.imap_unordered(portfolio_worker, jobs):
+            stats[name] = worker_stats
+            if decided:
+                assignment = result
+                break
+    finally:
+        pool.terminate()
+    return assignment, [stats[job[0]] for job in jobs]
 
 
 def read_from_file(fname):
@@ -398,15 +801,22 @@ def write_to_file(fname, has_answer, symbols=[]):
 
 
 def main():
+    """
+    With --portfolio, race several solvers, one process each, and print the
+    statistics of each; CDCL alone decides if no worker does
+    """
     model = read_from_file('input.txt')
-    dpll = DPLL()
-    if (dpll.dpll(model.clauseSet)):
-        walk = WalkSAT(model)
-        result = walk.walksat(0.5, 100000)
-        if result is None:
-            print 'error'
-        else:
-            write_to_file('output.txt', True, result)
+    if '--portfolio' in sys.argv[1:]:
+        assignment, stats = portfolio_solve(model)
+        for s in stats:
+            print ' '.join(['{0}={1}'.format(key, s[key]) for key in sorted(s)])
+        if not any(s['result'] in ('sat', 'unsat') for s in stats):
+            assignment = CDCL().solve(model.clauseSet)
+    else:
+        assignment = CDCL().solve(model.clauseSet)
+    if assignment is not None:
+        model.set_symbols(assignment)
+        write_to_file('output.txt', True, model.symbols)
     else:
         write_to_file('output.txt', False)
 
@@ -414,10 +824,7 @@ def main():
 def print_clause_set(clause_set):
     """for test"""
     for clause in clause_set:
-        c = []
-        for literal in clause:
-            c.append('({0} {1} {2})'.format(literal.positive, literal.guest, literal.table))
-        print ' '.join(c)
+        print ' '.join([str(literal) for literal in clause])
     print '---------------'
     return
 